@@ -0,0 +1,235 @@
+"""
+Aggregates of the issues that can be updated one issue at a time.
+
+The aggregates hold everything the dataset values (migration date, label
+categories, year range) and the analyses need, as counts. Adding or
+removing an issue only touches the counts of that issue, so a delta of new
+or changed issues is applied without going over the whole dataset again,
+and the aggregates of several dumps are merged by adding their counts.
+
+The periods the issues were open are counted as daily changes (UTC) per
+label, so they are bounded by the days of the dataset times the labels,
+not by the issues. Analysis1 needs the exact creation dates of the open
+issues, which are bounded by the open issues, and the durations in days
+of the closed ones, both by the sublabels an issue has in a category,
+which repeat across issues.
+"""
+
+import urllib.parse
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta, timezone
+
+from model import Issue, State
+
+
+class CountedValues:
+    """
+    Counts of values with their minimum and maximum kept up to date. The
+    extremes are only searched again when the last occurrence of one of
+    them is removed.
+    """
+
+    def __init__(self):
+        self.counts:Counter = Counter()
+        self.min = None
+        self.max = None
+
+    def add(self, value, count:int=1):
+        if value is None:
+            return
+        total = self.counts[value] + count
+        if total > 0:
+            self.counts[value] = total
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+            return
+        del self.counts[value]
+        if value == self.min:
+            self.min = min(self.counts, default=None)
+        if value == self.max:
+            self.max = max(self.counts, default=None)
+
+    def __eq__(self, other):
+        return isinstance(other, CountedValues) and self.counts == other.counts
+
+
+class Aggregates:
+
+    def __init__(self):
+        self.issue_count:int = 0
+        self.states:Counter = Counter()
+        self.max_event_dates:CountedValues = CountedValues()
+        # Created days, and closed days of the closed issues
+        self.created_dates:CountedValues = CountedValues()
+        self.closed_dates:CountedValues = CountedValues()
+        self.years:CountedValues = CountedValues()
+        # Label rows by category, and by category then sublabel
+        self.categories:Counter = Counter()
+        self.sublabels:defaultdict = defaultdict(Counter)
+        # Label rows by category, then by (year, month, sublabel) of the issue creation
+        self.monthly:defaultdict = defaultdict(Counter)
+        # Changes of the open label rows by category, then by (sublabel, day),
+        # so the running sum is the label rows open at the start of a day:
+        # +1 on the first day starting after a period the issue was open
+        # starts, -1 on the day after it ends (see Issue.get_open_intervals)
+        self.open_days:defaultdict = defaultdict(Counter)
+        # Created dates of the open issues and durations in days of the closed
+        # issues with a closed date (None without a created date)
+        self.open_created:Counter = Counter()
+        self.closed_durations:Counter = Counter()
+        # The same by category, then by (state, sublabels of the issue in the
+        # category, created date or duration)
+        self.labeled_states:defaultdict = defaultdict(Counter)
+        # Issues by repository ('owner/name', from their URL)
+        self.repositories:Counter = Counter()
+
+    @classmethod
+    def from_issues(cls, issues):
+        aggregates = cls()
+        for issue in issues:
+            aggregates.add(issue)
+        return aggregates
+
+    def add(self, issue:Issue, count:int=1):
+        """
+        Adds the issue to the aggregates, or removes it with a count of -1.
+        """
+        self.add_values(issue.state.value, issue.created_date, issue.closed_date, issue.max_event_date,
+                        issue.get_open_intervals(), [(label.category, label.sublabel) for label in issue.labels],
+                        repository_of(issue.url), count)
+
+    def add_values(self, state:str, created:datetime, closed_date:datetime, max_event_date:datetime,
+                   intervals:tuple, labels:list, repository:str, count:int=1):
+        """
+        Adds an issue given by its values, its open periods as (opened,
+        closed) pairs and its labels as (category, sublabel) pairs, e.g. read
+        from a columnar dataset without Issue objects.
+        """
+        closed = closed_date if state == State.closed else None
+        self.issue_count += count
+        _update(self.states, state, count)
+        self.max_event_dates.add(max_event_date, count)
+        self.created_dates.add(created.date() if created else None, count)
+        self.closed_dates.add(closed.date() if closed else None, count)
+        self.years.add(created.year if created else None, count)
+        changes = Counter()
+        for opened, ended in intervals:
+            changes[_start_day(opened)] += 1
+            if ended is not None:
+                changes[_utc(ended).date() + ONE_DAY] -= 1
+        for category, sublabel in labels:
+            _update(self.categories, category, count)
+            _update(self.sublabels[category], sublabel, count)
+            if created:
+                _update(self.monthly[category], (created.year, created.month, sublabel), count)
+            for day, change in changes.items():
+                if change:
+                    _update(self.open_days[category], (sublabel, day), change * count)
+
+        if state == State.open:
+            value = created
+            _update(self.open_created, value, count)
+        elif closed:
+            value = (closed - created).days if created else None
+            _update(self.closed_durations, value, count)
+        if state == State.open or closed:
+            sublabels = defaultdict(list)
+            for category, sublabel in labels:
+                sublabels[category].append(sublabel)
+            for category, names in sublabels.items():
+                _update(self.labeled_states[category], (state, tuple(names), value), count)
+        _update(self.repositories, repository, count)
+
+    def remove(self, issue:Issue):
+        self.add(issue, -1)
+
+    def merge(self, other:'Aggregates'):
+        """
+        Adds the counts of other aggregates, e.g. of another part of the dataset.
+        """
+        self.issue_count += other.issue_count
+        for mine, theirs in [(self.max_event_dates, other.max_event_dates), (self.created_dates, other.created_dates),
+                             (self.closed_dates, other.closed_dates), (self.years, other.years)]:
+            for value, count in theirs.counts.items():
+                mine.add(value, count)
+        for mine, theirs in [(self.states, other.states), (self.categories, other.categories),
+                             (self.open_created, other.open_created), (self.closed_durations, other.closed_durations),
+                             (self.repositories, other.repositories)]:
+            for value, count in theirs.items():
+                _update(mine, value, count)
+        for mine, theirs in [(self.monthly, other.monthly), (self.sublabels, other.sublabels),
+                             (self.open_days, other.open_days), (self.labeled_states, other.labeled_states)]:
+            for category, counts in theirs.items():
+                for value, count in counts.items():
+                    _update(mine[category], value, count)
+        return self
+
+    def get_migration_date(self) -> datetime:
+        return self.max_event_dates.max
+
+    def get_label_categories(self):
+        return list(self.categories)
+
+    def get_repository(self):
+        """
+        Returns the repository most issues belong to, or None.
+        """
+        repositories = [repository for repository, _ in self.repositories.most_common() if repository]
+        return repositories[0] if repositories else None
+
+    def get_year_range(self):
+        if self.years.min is None:
+            return []
+        return [str(each) for each in range(self.years.min, self.years.max + 1)]
+
+    def differences(self, other:'Aggregates'):
+        """
+        Returns the names of the aggregates that differ from the other ones.
+        """
+        names = ['issue_count', 'states', 'max_event_dates', 'created_dates', 'closed_dates', 'years', 'categories',
+                 'open_created', 'closed_durations', 'repositories']
+        differences = [name for name in names if getattr(self, name) != getattr(other, name)]
+        for name in ['monthly', 'sublabels', 'open_days', 'labeled_states']:
+            mine, theirs = getattr(self, name), getattr(other, name)
+            if {key: value for key, value in mine.items() if value} != {key: value for key, value in theirs.items() if value}:
+                differences.append(name)
+        return differences
+
+
+def repository_of(url:str):
+    """
+    Returns 'owner/name' of a GitHub issue URL, or None.
+    """
+    if not url:
+        return None
+    parts = urllib.parse.urlsplit(url).path.strip('/').split('/')
+    return '/'.join(parts[:2]) if len(parts) >= 2 else None
+
+
+ONE_DAY = timedelta(days=1)
+
+
+def _utc(value:datetime):
+    return value.astimezone(timezone.utc) if value.tzinfo is not None else value
+
+
+def _start_day(value:datetime):
+    """
+    Returns the first day (UTC) starting at or after the time.
+    """
+    value = _utc(value)
+    return value.date() if value.time() == time.min else value.date() + ONE_DAY
+
+
+def _update(counter:Counter, key, count:int):
+    """
+    Adds the count to the key, dropping keys whose count reaches zero so the
+    counters compare equal to freshly built ones.
+    """
+    total = counter[key] + count
+    if total:
+        counter[key] = total
+    else:
+        del counter[key]
@@ -1,113 +1,397 @@
 from collections import defaultdict, Counter
 from typing import List
-import matplotlib.pyplot as plt
-import pandas as pd
 
+# pandas, numpy and matplotlib are imported by the methods computing and
+# rendering the results, so choosing and validating an analysis stays fast
 from data_loader import DataLoader
-from model import Issue
 import config
+import profiling
+import result_cache
+
+
+def _choose(value, valid_values:List[str], prompt:str, interactive:bool):
+    """
+    Returns value if it is valid. Otherwise the user is asked for a valid
+    value, or a ValueError is raised when not running interactively.
+    """
+    while value == "" or value not in valid_values:
+        if not interactive:
+            raise ValueError(f"Invalid value '{value}', expected one of {valid_values}")
+        value = input(prompt)
+    return value
+
+
+def _state_frames(aggregates, category:str, state:str, value:str, max_date):
+    """
+    Returns the age (open) or duration (closed) of the issues in the state
+    and of their label rows in the category, the frames Analysis1 selects
+    from the issue and label tables, rebuilt from the counts of the
+    aggregates. The issues are numbered in the order of the counts.
+    """
+    import numpy as np
+    import pandas as pd
+    from frames import to_datetimes
+
+    def values(keys):
+        if state == "open":
+            return (max_date - to_datetimes(keys)).dt.days.to_numpy()
+        return pd.Series(keys, dtype=float).to_numpy()
+
+    counts = aggregates.open_created if state == "open" else aggregates.closed_durations
+    df = pd.DataFrame({value: np.repeat(values(list(counts)), list(counts.values()))})
+    labeled = [(sublabels, key, count) for (each, sublabels, key), count in aggregates.labeled_states.get(category, {}).items()
+               if each == state]
+    # Each count stands for that many issues, each with a row per sublabel
+    rows = np.repeat(np.array([len(sublabels) for sublabels, _, _ in labeled], dtype=np.int64),
+                     np.array([count for _, _, count in labeled], dtype=np.int64))
+    issue_values = np.repeat(values([key for _, key, _ in labeled]), [count for _, _, count in labeled])
+    df_e = pd.DataFrame({category: pd.Series([sublabel for sublabels, _, count in labeled for _ in range(count) for sublabel in sublabels], dtype=object).to_numpy()},
+                        index=np.repeat(np.arange(len(rows)), rows))
+    df_e.insert(0, value, np.repeat(issue_values, rows))
+    return df, df_e
+
+
+def _value_counts(values, weights):
+    """
+    Same as values.value_counts(), with each row counted by its weight
+    (both pandas Series).
+    """
+    return weights.groupby(values.to_numpy(), sort=False).sum().sort_values(ascending=False)
+
+
+# Percentiles estimated by the approximate mode of Analysis1
+PERCENTILES = [25, 50, 75, 90]
+
+
+def _add(total:list, days:int):
+    total[0] += days
+    total[1] += 1
+    total[2].add(days)
+
+
+DAY_US = 24 * 60 * 60 * 10**6
+
+
+def _add_created(total:list, created):
+    """
+    Adds an open issue by its creation date, before the migration date its
+    age is counted to is known: the negated epoch microseconds go to the
+    (sum, count, sketch) total, and their time of day to a fourth counter.
+    """
+    from timestamps import to_epoch_us
+    value = -to_epoch_us(created)
+    _add(total, value)
+    total[3][value % DAY_US] += 1
+
+
+def _ages(total:list, max_date):
+    """
+    Returns the (sum, count, sketch) total of the ages in days at the
+    migration date of a total of creation dates (see _add_created). The age
+    (max_date - created).days is non-decreasing in the negated creation
+    date, so the sketch is mapped value by value, and the exact sum of the
+    ages only needs the times of day.
+    """
+    from timestamps import to_epoch_us
+    migration = to_epoch_us(max_date)
+    remainders = sum(count * ((migration + value) % DAY_US) for value, count in total[3].items())
+    days = (migration * total[1] + total[0] - remainders) // DAY_US
+    return [days, total[1], total[2].map(lambda value: (migration + value) // DAY_US)]
+
+
+def _sketch_stats(total:list):
+    """
+    Returns the exact mean and the estimated median and percentiles of a
+    (sum, count, sketch) total.
+    """
+    quantiles = total[2].quantiles([p / 100 for p in PERCENTILES])
+    stats = {"mean": total[0] / total[1] if total[1] else float("nan")}
+    stats["median"] = quantiles[PERCENTILES.index(50)] if total[1] else float("nan")
+    return stats | {f"p{p}": float(q) if q is not None else float("nan") for p, q in zip(PERCENTILES, quantiles)}
 
 
 COLORS = ["#2E65AD", '#55A868', '#C44E52', "#7A5DD8", "#BB9F3B", '#64B5CD', "#DD8A32", "#DC4CC4", "#B6EB54", "#3ACE9F"]
 
 class Analysis1:
-    def __init__(self):
-        self.loader = DataLoader()
-        self.set_category(config.get_parameter('category'))
+    # Increase when the computed result changes, to invalidate cached results
+    VERSION = 1
+
+    def __init__(self, category:str=None, interactive:bool=True):
+        # Estimate the medians and percentiles with quantile sketches in one streaming pass
+        self.APPROXIMATE:bool = bool(config.get_parameter('approximate'))
+        # Streams the dataset values too (unless the snapshot has them), so the issues are never all loaded
+        self.loader = DataLoader(streaming=True if self.APPROXIMATE else None)
+        self.interactive = interactive
+        self.set_category(category or config.get_parameter('category'))
+        self.set_repository(config.get_parameter('repository'))
         self.OTHER_CUTOUT = config.get_parameter('other_cutout',5) / 100
-        
+        # Items kept by each quantile sketch
+        self.SKETCH_SIZE:int = int(config.get_parameter('ENPM611_PROJECT_SKETCH_SIZE', 200))
+
 
     def set_category(self, value):
         valid_categories:List[str] = self.loader.get_label_categories()
-        while value == "" or value not in valid_categories:
-            value = input(f"Choose a valid category from the following list [{(', ').join(valid_categories)}]: ")
-        self.CATEGORY:str = value
+        self.CATEGORY:str = _choose(value, valid_categories, f"Choose a valid category from the following list [{(', ').join(valid_categories)}]: ", self.interactive)
   
+    def set_repository(self, value):
+        # All repositories combined without a value
+        self.REPOSITORY:str = None
+        if value:
+            valid_repositories:List[str] = self.loader.get_repositories()
+            self.REPOSITORY = _choose(value, valid_repositories, f"Choose a valid repository from the following list {valid_repositories}: ", self.interactive)
+
+    def params(self):
+        params = {"category": self.CATEGORY, "other_cutout": self.OTHER_CUTOUT, "repository": self.REPOSITORY,
+                  "approximate": self.APPROXIMATE}
+        if self.APPROXIMATE:
+            params["sketch_size"] = self.SKETCH_SIZE
+        return params
 
     def run(self):
-        issues:List[Issue] = self.loader.get_issues()
-        max_date = self.loader.get_migration_date()
+        import matplotlib.pyplot as plt
+
+        result = result_cache.compute(self)
+        with profiling.phase(f"{type(self).__name__}.report"):
+            self.report(result)
+        with profiling.phase(f"{type(self).__name__}.render"):
+            self.render(result)
+        with profiling.phase(f"{type(self).__name__}.show"):
+            plt.show()
+
+    def compute(self):
+        """
+        Computes the age of open issues and the duration of closed issues by
+        label. Returns the histogram tables by state and the statistics.
+        With several data files the issues are rebuilt from the merged
+        aggregates, one row per issue without its number.
+        """
+        if self.APPROXIMATE:
+            return self.compute_approximate()
+
+        import pandas as pd
+
         category = self.CATEGORY
-        
-        
-        plots = {}
+        if self.loader.sharded:
+            aggregates = self.loader.get_aggregates(self.REPOSITORY)
+            max_date = pd.Timestamp(self.loader.get_migration_date(self.REPOSITORY))
+        else:
+            issues:pd.DataFrame = self.loader.get_issue_frame()
+            labels:pd.DataFrame = self.loader.get_label_frame()
+            index = self.loader.get_index()
+            max_date = pd.Timestamp(self.loader.get_migration_date())
+
+        tables = {}
+        stats = {"category": category}
         for state,value in zip(["open","closed"],["age","duration"]):
-            if state == "open":
-                df = pd.DataFrame([{value:(max_date - issue.created_date).days}|
-                                {category:[getattr(label,"sublabel",None) for label in issue.labels if label.category==category]}
-                                 for issue in issues if issue.state==state])
+            if self.loader.sharded:
+                df, df_e = _state_frames(aggregates, category, state, value, max_date)
             else:
-                df = pd.DataFrame([{value:(issue.closed_date - issue.created_date).days}|
-                                {category:[getattr(label,"sublabel",None) for label in issue.labels if label.category==category]}
-                                 for issue in issues if issue.state==state and issue.closed_date])
-            df_e = df.explode(category).dropna(subset=[category])
+                selected = issues.iloc[index.issues(state=state)]
+                if state == "open":
+                    df = pd.DataFrame({value:(max_date - selected["created_date"]).dt.days})
+                else:
+                    selected = selected[selected["closed_date"].notna()]
+                    df = pd.DataFrame({value:(selected["closed_date"] - selected["created_date"]).dt.days})
+                selected_labels = labels.iloc[index.label_rows(category, selected.index.to_numpy())]
+                df_e = pd.DataFrame({category:selected_labels["sublabel"].astype(object).to_numpy()}, index=selected_labels["issue"].to_numpy())
+                df_e.insert(0, value, df[value].reindex(df_e.index))
             count = df_e[value].count()
             if count:
                 vc=df_e[category].value_counts()
                 keep = vc[vc > count * self.OTHER_CUTOUT].index
-                df_e[category] = df_e[category].map(lambda x:"other" if x not in keep else x)
+                df_e[category] = df_e[category].where(df_e[category].isin(keep), "other")
                 df_e = df_e.reset_index().drop_duplicates(subset=['index',value,category])
-                df_e_pivot = df_e.pivot(index="index",columns=category,values=value)
-                plots[state] = df_e_pivot.plot(kind="hist",stacked=True, color=COLORS, xlabel="Days open" if state=="open" else "Duration (days)",ylabel='Number of issues',title=f"{'Open Issue Age' if state=='open' else 'Closed Issue Duration'} by {category}")
-                print(f"{'='*40}\n{'='*40}\n{state} issues".upper())
-                print(f"Mean {value} (days):   {df[value].mean():.2f}")
-                print(f"Median {value} (days): {df[value].median():.2f}")
-                
-                print(f"\nIssues {state} labeled with '{category}' category: {count}")
-                for key, count in df_e[category].value_counts().items():
-                    select_df = df_e[df_e[category]==key]
-                    print(f"[{category}/{key}] - Count: {count}, Mean {value}: {select_df[value].mean():.2f}, Median {value}: {select_df[value].median():.2f}")
-
-        plt.show()
+                with profiling.phase("Analysis1.pivot"):
+                    tables[f"{state}_{value}"] = df_e.pivot(index="index",columns=category,values=value)
+                # One grouped aggregation for every label, in the order of their counts
+                vc = df_e[category].value_counts()
+                grouped = df_e.groupby(category, sort=False)[value].agg(["mean", "median"]).reindex(vc.index)
+                label_stats = [{"label": key, "count": int(label_count), "mean": float(mean), "median": float(median)}
+                               for (key, label_count), mean, median in zip(vc.items(), grouped["mean"], grouped["median"])]
+                stats[state] = {"value": value, "mean": float(df[value].mean()), "median": float(df[value].median()),
+                                "count": int(count), "labels": label_stats}
+        tables["label_stats"] = pd.DataFrame([{"state": state} | label_stat
+                                              for state in ["open","closed"] if state in stats
+                                              for label_stat in stats[state]["labels"]])
+        return {"feature": 1, "repository": self.REPOSITORY, "category": category, "tables": tables, "stats": stats}
+
+    def compute_approximate(self):
+        """
+        Computes the same statistics in one pass over the streamed issues,
+        keeping the means and counts exact and estimating the medians and
+        percentiles with a quantile sketch per state and label (see
+        sketches.py), so the memory doesn't grow with the issues. The
+        histogram tables hold the weighted values kept by the sketches.
+        Issues with several labels merged into 'other' count once per label.
+        The ages of the open issues are counted after the pass, which also
+        finds the migration date when no snapshot has it.
+        """
+        import pandas as pd
+        from sketches import QuantileSketch
+
+        size = self.SKETCH_SIZE
+        category = self.CATEGORY
+        # (sum, count, sketch) of the issues by state, and of the label rows by
+        # state and label. Open issues are added by creation date (see _add_created)
+        def total(state):
+            return [0, 0, QuantileSketch(size)] + ([Counter()] if state == "open" else [])
+        add = {"open": _add_created, "closed": _add}
+        totals = {state: total(state) for state in ["open", "closed"]}
+        labeled = {state: {} for state in ["open", "closed"]}
+        rows = {state: Counter() for state in ["open", "closed"]}
+        with profiling.phase("Analysis1.stream"):
+            for issue in self.loader.iter_issues(self.REPOSITORY):
+                state = issue.state.value
+                if state == "open":
+                    value = issue.created_date
+                elif issue.closed_date:
+                    value = (issue.closed_date - issue.created_date).days if issue.created_date else None
+                else:
+                    continue
+                if value is not None:
+                    add[state](totals[state], value)
+                # A label repeated on the issue counts once, as in the label table
+                for label_category, sublabel in dict.fromkeys((label.category, label.sublabel) for label in issue.labels):
+                    if label_category == category:
+                        rows[state][sublabel] += 1
+                        if value is not None:
+                            add[state](labeled[state].setdefault(sublabel, total(state)), value)
+        max_date = self.loader.get_migration_date(self.REPOSITORY)
+        totals["open"] = _ages(totals["open"], max_date)
+        labeled["open"] = {key: _ages(each, max_date) for key, each in labeled["open"].items()}
+
+        tables = {}
+        stats = {"category": category, "approximate": True}
+        for state,value in zip(["open","closed"],["age","duration"]):
+            count = sum(total[1] for total in labeled[state].values())
+            if not count:
+                continue
+            merged = {}
+            for key, label_count in rows[state].most_common():
+                name = key if label_count > count * self.OTHER_CUTOUT else "other"
+                total = merged.setdefault(name, [0, 0, QuantileSketch(size), 0])
+                total[3] += label_count
+                if key in labeled[state]:
+                    total[0] += labeled[state][key][0]
+                    total[1] += labeled[state][key][1]
+                    total[2].merge(labeled[state][key][2])
+            label_stats = [{"label": key, "count": total[3]} | _sketch_stats(total)
+                           for key, total in sorted(merged.items(), key=lambda each: -each[1][3])]
+            tables[f"{state}_{value}"] = pd.DataFrame([{category: key, value: kept, "weight": weight}
+                                                      for key, total in merged.items() for kept, weight in total[2].items()])
+            stats[state] = {"value": value, **_sketch_stats(totals[state]), "count": count, "labels": label_stats}
+        tables["label_stats"] = pd.DataFrame([{"state": state} | label_stat
+                                              for state in ["open","closed"] if state in stats
+                                              for label_stat in stats[state]["labels"]])
+        return {"feature": 1, "repository": self.REPOSITORY, "category": category, "tables": tables, "stats": stats}
+
+    def report(self, result):
+        """
+        Prints the statistics of the result to the console.
+        """
+        stats = result["stats"]
+        category = stats["category"]
+        for state in ["open","closed"]:
+            if state not in stats:
+                continue
+            value = stats[state]["value"]
+            print(f"{'='*40}\n{'='*40}\n{state} issues".upper())
+            print(f"Mean {value} (days):   {stats[state]['mean']:.2f}")
+            print(f"Median {value} (days): {stats[state]['median']:.2f}")
+
+            if stats.get("approximate"):
+                print(f"Percentiles {value} (days): " + ", ".join(f"p{p}: {stats[state][f'p{p}']:.2f}" for p in PERCENTILES))
+
+            print(f"\nIssues {state} labeled with '{category}' category: {stats[state]['count']}")
+            for label in stats[state]["labels"]:
+                print(f"[{category}/{label['label']}] - Count: {label['count']}, Mean {value}: {label['mean']:.2f}, Median {value}: {label['median']:.2f}")
+
+    @staticmethod
+    def render(result):
+        """
+        Draws the histograms of the result, returns the figures by name.
+        """
+        import matplotlib.pyplot as plt
+
+        category = result["category"]
+        figures = {}
+        for state,value in zip(["open","closed"],["age","duration"]):
+            name = f"{state}_{value}"
+            if name in result["tables"] and result["stats"].get("approximate"):
+                # Weighted values kept by the sketches, one stacked series per label
+                table = result["tables"][name]
+                groups = [(key, rows) for key, rows in table.groupby(category, sort=False)]
+                fig, ax = plt.subplots()
+                ax.hist([rows[value] for _, rows in groups], weights=[rows["weight"] for _, rows in groups], stacked=True,
+                        color=COLORS[:len(groups)], label=[key for key, _ in groups])
+                ax.set(xlabel="Days open" if state=="open" else "Duration (days)", ylabel='Number of issues',
+                       title=f"{'Open Issue Age' if state=='open' else 'Closed Issue Duration'} by {category} (approximate)")
+                ax.legend(title=category)
+                figures[name] = fig
+            elif name in result["tables"]:
+                ax = result["tables"][name].plot(kind="hist",stacked=True, color=COLORS, xlabel="Days open" if state=="open" else "Duration (days)",ylabel='Number of issues',title=f"{'Open Issue Age' if state=='open' else 'Closed Issue Duration'} by {category}")
+                figures[name] = ax.get_figure()
+        return figures
 
 class Analysis2:
-    def __init__(self):
+    # Increase when the computed result changes, to invalidate cached results
+    VERSION = 1
+
+    def __init__(self, category:str=None, year:str=None, interactive:bool=True):
         self.loader = DataLoader()
-        self.set_category(config.get_parameter('category'))
-        self.set_year(config.get_parameter('year'))
+        self.interactive = interactive
+        self.set_category(category or config.get_parameter('category'))
+        self.set_year(year or config.get_parameter('year'))
+        self.set_repository(config.get_parameter('repository'))
 
     def set_category(self, value):
         valid_categories:List[str] = self.loader.get_label_categories()
-        while value == "" or value not in valid_categories:
-            value = input(f"Choose a valid category from the following list [{(', ').join(valid_categories)}]: ")
-        self.CATEGORY:str = value
+        self.CATEGORY:str = _choose(value, valid_categories, f"Choose a valid category from the following list [{(', ').join(valid_categories)}]: ", self.interactive)
   
 
     def set_year(self, value):
         valid_years:List[str] = self.loader.get_year_range() + ["all"]
-        value = str(value)
-        while value == "" or value not in valid_years:
-            value = input(f"Choose a valid year from the following list {valid_years}: ")
-        self.ISSUE_YEAR:str = value
+        self.ISSUE_YEAR:str = _choose(str(value), valid_years, f"Choose a valid year from the following list {valid_years}: ", self.interactive)
+
+    def set_repository(self, value):
+        # All repositories combined without a value
+        self.REPOSITORY:str = None
+        if value:
+            valid_repositories:List[str] = self.loader.get_repositories()
+            self.REPOSITORY = _choose(value, valid_repositories, f"Choose a valid repository from the following list {valid_repositories}: ", self.interactive)
+
+    def params(self):
+        return {"category": self.CATEGORY, "year": self.ISSUE_YEAR, "repository": self.REPOSITORY}
 
     def run(self):
-        issues: List[Issue] = self.loader.get_issues()
+        import matplotlib.pyplot as plt
 
-        all_issues = False
-        year = None
-        category = self.CATEGORY
-        if self.ISSUE_YEAR == 'all':
-            all_issues = True
-        else:
-            year = int (self.ISSUE_YEAR)
+        result = result_cache.compute(self)
+        with profiling.phase(f"{type(self).__name__}.report"):
+            self.report(result)
+        with profiling.phase(f"{type(self).__name__}.render"):
+            self.render(result)
+        with profiling.phase(f"{type(self).__name__}.show"):
+            plt.show()
 
-        if all_issues:
-            filtered_issues = issues
-        else:
-            filtered_issues = [
-                issue for issue in issues
-                if issue.created_date and issue.created_date.year == year and issue.labels
-            ]
+    def compute(self):
+        """
+        Counts the issues created each month by label, for the top 10 labels
+        of the category.
+        """
+        import pandas as pd
+
+        aggregates = self.loader.get_aggregates(self.REPOSITORY)
+        category = self.CATEGORY
 
         # ---------------------------
         # Aggregate monthly counts
         # ---------------------------
         monthly_counts = defaultdict(lambda: Counter())
 
-        for issue in filtered_issues:
-            month = issue.created_date.strftime("%Y-%m")
-            for label in [label.sublabel for label in issue.labels if label.category == category]:
-                monthly_counts[month][label] += 1
+        for (year, month, label), count in aggregates.monthly.get(category, {}).items():
+            if self.ISSUE_YEAR == 'all' or year == int(self.ISSUE_YEAR):
+                monthly_counts[f"{year:04d}-{month:02d}"][label] += count
 
         # ---------------------------
         # Aggregate top labels
@@ -120,6 +404,26 @@ class Analysis2:
 
         months = sorted(monthly_counts.keys())
         data = {label: [monthly_counts[m][label] for m in months] for label in top_labels}
+        monthly_issues = pd.DataFrame(data, index=pd.Index(months, name="month"), columns=top_labels)
+        return {"feature": 2, "repository": self.REPOSITORY, "category": category, "year": self.ISSUE_YEAR,
+                "tables": {"monthly_issues": monthly_issues}, "stats": None}
+
+    def report(self, result):
+        pass
+
+    @staticmethod
+    def render(result):
+        """
+        Draws the stacked bar chart of the result, returns the figures by name.
+        """
+        import matplotlib.pyplot as plt
+
+        category = result["category"]
+        monthly_issues = result["tables"]["monthly_issues"]
+        months = list(monthly_issues.index)
+        top_labels = list(monthly_issues.columns)
+        data = {label: monthly_issues[label].tolist() for label in top_labels}
+
 
         # ---------------------------
         # Plot stacked bar chart
@@ -131,48 +435,100 @@ class Analysis2:
             ax.bar(months, data[label], bottom=bottom, label=label, color=color, alpha=0.85)
             bottom = [bottom[i] + data[label][i] for i in range(len(months))]
 
-        ax.set_title(f"Monthly Issue Creation Trend by {category} ({self.ISSUE_YEAR})")
+        ax.set_title(f"Monthly Issue Creation Trend by {category} ({result['year']})")
         ax.set_xlabel("Month")
         ax.set_ylabel("Number of Issues Created")
         ax.legend(title=category)
         plt.xticks(rotation=45)
         plt.tight_layout()
-        plt.show()
+        return {"monthly_issues": fig}
 
 class Analysis3:
-    def __init__(self):
+    # Increase when the computed result changes, to invalidate cached results
+    VERSION = 3
+
+    def __init__(self, category:str=None, interactive:bool=True):
         self.loader = DataLoader()
-        self.set_category(config.get_parameter('category'))
+        self.interactive = interactive
+        self.set_category(category or config.get_parameter('category'))
+        self.set_repository(config.get_parameter('repository'))
         self.OTHER_CUTOUT = config.get_parameter('other_cutout',2) / 100
+        self.RESOLUTION:str = config.get_parameter('resolution','day')
+        self.START = config.get_parameter('start')
+        self.END = config.get_parameter('end')
 
     def set_category(self, value):
         valid_categories:List[str] = self.loader.get_label_categories()
-        while value == "" or value not in valid_categories:
-            value = input(f"Choose a valid category from the following list [{(', ').join(valid_categories)}]: ")
-        self.CATEGORY:str = value
+        self.CATEGORY:str = _choose(value, valid_categories, f"Choose a valid category from the following list [{(', ').join(valid_categories)}]: ", self.interactive)
+
+    def set_repository(self, value):
+        # All repositories combined without a value
+        self.REPOSITORY:str = None
+        if value:
+            valid_repositories:List[str] = self.loader.get_repositories()
+            self.REPOSITORY = _choose(value, valid_repositories, f"Choose a valid repository from the following list {valid_repositories}: ", self.interactive)
         
+    def params(self):
+        return {"category": self.CATEGORY, "other_cutout": self.OTHER_CUTOUT,
+                "resolution": self.RESOLUTION, "start": self.START, "end": self.END, "repository": self.REPOSITORY}
+
     def run(self):
-        issues:List[Issue] = self.loader.get_issues()
-        max_date = self.loader.get_migration_date()
+        import matplotlib.pyplot as plt
+
+        result = result_cache.compute(self)
+        with profiling.phase(f"{type(self).__name__}.report"):
+            self.report(result)
+        with profiling.phase(f"{type(self).__name__}.render"):
+            self.render(result)
+        with profiling.phase(f"{type(self).__name__}.show"):
+            plt.show()
+
+    def compute(self):
+        """
+        Counts how many issues of each label were open at the start (00:00
+        UTC) of each day, from the periods the issues were open between their
+        closed and reopened events.
+        """
+        import numpy as np
+        import pandas as pd
+        from workload import sample_dates
+
+        aggregates = self.loader.get_aggregates(self.REPOSITORY)
+        max_date = pd.Timestamp(self.loader.get_migration_date(self.REPOSITORY))
         category = self.CATEGORY
-        df = pd.DataFrame([{"created_date":issue.created_date,"closed_date":(issue.closed_date if issue.state=="closed" else max_date)}|{category:[getattr(label,"sublabel",None) for label in issue.labels if label.category==category]} for issue in issues])
-        df_e = df.explode(category).dropna(subset=[category])
+        # Label rows by label
+        sublabels = aggregates.sublabels.get(category, {})
+        labels = pd.Series(list(sublabels), dtype=object)
+        weights = pd.Series(list(sublabels.values()), dtype=np.int64)
 
-        date_range = pd.date_range(df['created_date'].min(), df['closed_date'].max(), freq='D')
-        # For each date, count how many issues are open
-        count = df_e["created_date"].count()
-        vc = df_e[category].value_counts()
+        last_dates = [aggregates.closed_dates.max] + ([max_date] if aggregates.issue_count > aggregates.states["closed"] else [])
+        dates = sample_dates(pd.to_datetime(aggregates.created_dates.min, utc=True),
+                             max(pd.to_datetime(each, utc=True) for each in last_dates if each is not None),
+                             self.START, self.END, self.RESOLUTION)
+        # Labels below the cutout of the rows with a created date are grouped as "other"
+        count = sum(aggregates.monthly.get(category, {}).values())
+        vc = _value_counts(labels, weights)
         keep = vc[vc > count * self.OTHER_CUTOUT].index
-        df_e[category] = df_e[category].map(lambda x:"other" if x not in keep else x)
-        counts={}
-        for label in df_e[category].value_counts().index:
-            counts[label]=[((df_e['created_date'] <= dt) & (df_e[category]==label) & (df_e['closed_date'] >= dt)).sum() for dt in date_range]
+        groups = labels.where(labels.isin(keep), "other")
+        counts = self.loader.get_interval_index(category, self.REPOSITORY).open_counts(dates, list(dict.fromkeys(labels)))
+        workload = pd.DataFrame({"date": dates})
+        for group in _value_counts(groups, weights).index:
+            members = list(dict.fromkeys(labels[groups == group]))
+            workload[group] = counts[members].sum(axis=1).to_numpy(dtype=np.int64)
+        return {"feature": 3, "repository": self.REPOSITORY, "category": category, "tables": {"open_issues": workload}, "stats": None}
+
+    def report(self, result):
+        pass
 
-        # # Put into DataFrame
-        workload = pd.DataFrame({'date': date_range}|counts)
-        workload['date'] = workload['date']
+    @staticmethod
+    def render(result):
+        """
+        Draws the area chart of the result, returns the figures by name.
+        """
+        workload = result["tables"]["open_issues"]
+        ax = workload.plot.area(x="date", color=COLORS, ylabel=f'Open Issues by {result["category"]}', title='Historical Open Issues')
+        return {"open_issues": ax.get_figure()}
 
-        # # Plot
-        workload.plot.area(x="date", color=COLORS, ylabel=f'Open Issues by {category}', title='Historical Open Issues')
 
-        plt.show()
\ No newline at end of file
+# Analyses by the number of their --feature flag
+FEATURES = {1: Analysis1, 2: Analysis2, 3: Analysis3}
@@ -0,0 +1,112 @@
+"""
+Runs several analyses for several categories and years in one process.
+
+The issues and the shared tables are loaded once, before any analysis runs.
+With more than one worker the analyses are computed on forked worker
+processes, which inherit the loaded data instead of reloading it. Results
+are looked up in the result cache first. Figures are only rendered when
+exporting the results (see export.py). Analyses never
+prompt for input in batch mode, invalid categories or years fail the run
+upfront.
+"""
+
+import contextlib
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import result_cache
+from analyses import FEATURES, Analysis2
+from data_loader import DataLoader
+from export import export
+
+
+def parse_values(value:str, valid_values:List[str]):
+    """
+    Parses a comma separated list of values. 'all' (or no value) selects
+    every valid value.
+    """
+    if not value or value == 'all':
+        return list(valid_values)
+    values = [each.strip() for each in str(value).split(',') if each.strip()]
+    invalid = [each for each in values if each not in valid_values]
+    if invalid:
+        raise ValueError(f"Invalid values {invalid}, expected any of {valid_values}")
+    return values
+
+
+def make_jobs(features:List[int], categories:str=None, years:str=None):
+    """
+    Returns the (feature, category, year) combinations to run. Only the
+    monthly analysis (2) uses the year, for it 'all' selects each year
+    plus the analysis of all years together.
+    """
+    loader = DataLoader()
+    invalid = [feature for feature in features if feature not in FEATURES]
+    if invalid:
+        raise ValueError(f"Invalid features {invalid}, expected any of {list(FEATURES)}")
+    categories = parse_values(categories, sorted(loader.get_label_categories()))
+    years = parse_values(years, loader.get_year_range() + ['all'])
+    jobs = []
+    for feature in features:
+        for category in categories:
+            for year in (years if feature == 2 else [None]):
+                jobs.append((feature, category, year))
+    return jobs
+
+
+def make_analysis(job:tuple):
+    feature, category, year = job
+    if feature == 2:
+        return Analysis2(category, year, interactive=False)
+    return FEATURES[feature](category, interactive=False)
+
+
+def run_job(job:tuple):
+    """
+    Computes one analysis and returns its console output and its result.
+    """
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        result = make_analysis(job).compute()
+    return stdout.getvalue(), result
+
+
+def run_batch(features:List[int], categories:str=None, years:str=None, workers:int=1,
+              output:str=None, formats:List[str]=None, table_format:str='csv'):
+    """
+    Runs every combination of features, categories and years, printing the
+    output of each analysis in order and exporting the results to the
+    output folder, if given. Results found in the result cache are not
+    computed again, and the data is only loaded if some result is missing.
+    """
+    jobs = make_jobs(features, categories, years)
+    analyses = [make_analysis(job) for job in jobs]
+    results = [result_cache.lookup(analysis) for analysis in analyses]
+    texts = [''] * len(jobs)
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    print(f"Running {len(missing)} of {len(jobs)} analyses on {workers} worker(s), {len(jobs) - len(missing)} cached")
+    if missing:
+        # Load everything the analyses share before forking the workers
+        DataLoader().preload()
+
+        if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                computed = list(pool.map(run_job, [jobs[i] for i in missing]))
+        else:
+            computed = [run_job(jobs[i]) for i in missing]
+        for i, (text, result) in zip(missing, computed):
+            texts[i] = text
+            results[i] = result
+            result_cache.store(analyses[i], result)
+
+    for (feature, category, year), analysis, text, result in zip(jobs, analyses, texts, results):
+        title = f"Feature {feature} - category {category}" + (f" - year {year}" if year else "")
+        print(f"{'#'*60}\n{title}\n{'#'*60}")
+        print(text, end='')
+        analysis.report(result)
+    if output:
+        paths = export(results, output, formats, table_format, workers)
+        print(f"Wrote {len(paths)} files to {output}")
@@ -0,0 +1,60 @@
+"""
+Measures the memory held by the loaded model, in bytes per issue, for a
+data file and for a synthetic dump 10 times its size.
+
+    python -m benchmarks.bench_memory [--data PATH] [--scale N]
+"""
+
+import argparse
+import gc
+import json
+import os
+import tempfile
+import tracemalloc
+
+import config
+import timestamps
+from model import Issue
+from benchmarks import synthetic
+
+
+def measure(path:str):
+    """
+    Returns the number of issues in the file and the bytes retained by
+    their model objects once the decoded JSON is released.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    with open(path, 'r') as fin:
+        jobjs = json.load(fin)
+    issues = [Issue(jobj) for jobj in jobjs]
+    del jobjs
+    # The memo shares parsed dates between issues but isn't part of the model
+    timestamps.clear_cache()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return len(issues), retained
+
+
+def main():
+    ap = argparse.ArgumentParser("bench_memory")
+    ap.add_argument('--data', type=str, default=config.get_parameter('ENPM611_PROJECT_DATA_PATH'),
+                    help='Data file to measure (default: ENPM611_PROJECT_DATA_PATH)')
+    ap.add_argument('--scale', type=int, default=10,
+                    help='Size of the synthetic dump relative to the data file')
+    args = ap.parse_args()
+
+    count, retained = measure(args.data)
+    print(f"{args.data}: {count} issues, {retained / count:,.0f} bytes/issue")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic.json')
+        synthetic.write(path, count * args.scale)
+        count, retained = measure(path)
+        print(f"synthetic x{args.scale}: {count} issues, {retained / count:,.0f} bytes/issue")
+
+
+if __name__ == '__main__':
+    main()
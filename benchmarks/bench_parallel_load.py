@@ -0,0 +1,49 @@
+"""
+Measures how the parallel loader scales with the number of workers on a
+synthetic dump.
+
+    python -m benchmarks.bench_parallel_load [--count N] [--workers 1 2 4 8 16]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import parallel_loader
+from benchmarks import synthetic
+
+
+def main():
+    ap = argparse.ArgumentParser("bench_parallel_load")
+    ap.add_argument('--count', '-n', type=int, default=100_000,
+                    help='Number of synthetic issues')
+    ap.add_argument('--workers', '-w', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                    help='Worker counts to measure')
+    ap.add_argument('--repeat', type=int, default=3,
+                    help='Runs per worker count, the fastest is reported')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic.json')
+        synthetic.write(path, args.count)
+        with open(path, 'r') as fin:
+            jobjs = json.load(fin)
+
+    print(f"{args.count} issues, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'seconds':>8} {'speedup':>8}")
+    serial = None
+    for workers in args.workers:
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            parallel_loader.load(jobjs, workers)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        serial = serial or best
+        print(f"{workers:>7} {best:>8.2f} {serial / best:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark of the timestamp parsing used by the model.
+
+Compares dateutil, which the model used before, with timestamps.parse_timestamp
+on GitHub-style ISO-8601 strings, both with all-distinct strings (no memo hits)
+and with the repetition found in a real dump (issue and event dates overlap).
+
+    python -m benchmarks.bench_timestamps [--count N]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser
+
+import timestamps
+
+
+def make_samples(count:int, distinct:int, seed:int=611):
+    """
+    Returns `count` GitHub-style timestamps drawn from `distinct` values.
+    """
+    rnd = random.Random(seed)
+    base = datetime(2018, 1, 1, tzinfo=timezone.utc)
+    pool = []
+    for i in range(distinct):
+        date = base + timedelta(seconds=rnd.randint(0, 8 * 365 * 86400))
+        # Mix both suffixes found in GitHub exports
+        pool.append(date.isoformat() if i % 2 else date.strftime('%Y-%m-%dT%H:%M:%SZ'))
+    return [pool[rnd.randrange(distinct)] for _ in range(count)]
+
+
+def measure(parse, samples):
+    start = time.perf_counter()
+    for value in samples:
+        parse(value)
+    return len(samples) / (time.perf_counter() - start)
+
+
+def main():
+    ap = argparse.ArgumentParser("bench_timestamps")
+    ap.add_argument('--count', '-n', type=int, default=200_000,
+                    help='Number of timestamps parsed per case')
+    args = ap.parse_args()
+
+    cases = {
+        'distinct': make_samples(args.count, args.count),
+        'repeated': make_samples(args.count, max(1, args.count // 4)),
+    }
+    print(f"{'case':<10} {'parser':<12} {'parses/s':>12} {'speedup':>8}")
+    for name, samples in cases.items():
+        timestamps.clear_cache()
+        for value in samples[:1000]:
+            assert timestamps.parse_timestamp(value) == parser.parse(value)
+        timestamps.clear_cache()
+        before = measure(parser.parse, samples)
+        after = measure(timestamps.parse_timestamp, samples)
+        print(f"{name:<10} {'dateutil':<12} {before:>12,.0f} {'':>8}")
+        print(f"{name:<10} {'fast path':<12} {after:>12,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
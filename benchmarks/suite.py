@@ -0,0 +1,216 @@
+"""
+Benchmark suite measuring how loading and the analyses scale with the
+number of issues, on synthetic dumps of increasing size.
+
+Every phase is measured in a fresh process, so the singletons of the data
+loader start empty and the memory of one phase doesn't leak into the next.
+A phase is timed without tracing (fastest of --repeat runs), then run once
+more under tracemalloc for its peak Python memory. The results are written
+as JSON and can be compared against a baseline run:
+
+    python -m benchmarks.suite [--sizes 1000 10000 100000] [--output PATH]
+    python -m benchmarks.suite --baseline PATH [--time-threshold 0.2]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks import synthetic
+
+PHASES = ['parse', 'model', 'load', 'migration_date', 'analysis1', 'analysis2', 'analysis3']
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def _setup(phase:str, path:str):
+    """
+    Prepares everything the phase needs and returns the function measured.
+    """
+    if phase == 'parse':
+        def parse():
+            with open(path, 'r') as fin:
+                return json.load(fin)
+        return parse
+    if phase == 'model':
+        from model import Issue
+        with open(path, 'r') as fin:
+            jobjs = json.load(fin)
+        return lambda: [Issue(jobj) for jobj in jobjs]
+
+    from data_loader import DataLoader
+    loader = DataLoader()
+    if phase == 'load':
+        return loader.get_issues
+    loader.get_issues()
+    if phase == 'migration_date':
+        return loader.get_migration_date
+    loader.get_migration_date()
+    loader.get_label_categories()
+    loader.get_year_range()
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from analyses import FEATURES, Analysis2
+    feature = int(phase[len('analysis'):])
+
+    def run():
+        analysis = Analysis2('kind', 'all', interactive=False) if feature == 2 else FEATURES[feature]('kind', interactive=False)
+        analysis.run()
+        plt.close('all')
+    return run
+
+
+def measure(phase:str, path:str, trace:bool):
+    """
+    Runs the phase once in this process and returns its measurements.
+    """
+    measured = _setup(phase, path)
+    if trace:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        measured()
+        peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        return {'peak_bytes': peak}
+    start = time.perf_counter()
+    measured()
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    return {'seconds': seconds, 'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+
+
+def run_phase(phase:str, path:str, trace:bool):
+    """
+    Measures the phase in a fresh process.
+    """
+    env = dict(os.environ, ENPM611_PROJECT_DATA_PATH=path, no_cache='true', no_result_cache='true', MPLBACKEND='Agg')
+    command = [sys.executable, '-m', 'benchmarks.suite', '--child', phase, '--data', path] + (['--trace'] if trace else [])
+    process = subprocess.run(command, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Phase {phase} failed on {path}:\n{process.stderr}")
+    # The measurements are the last line, the loader prints its progress before
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def get_dump(data_dir:str, size:int, seed:int):
+    """
+    Returns the path of the synthetic dump with `size` issues, writing it
+    if it doesn't exist yet.
+    """
+    path = os.path.join(data_dir, f"synthetic_{size}_{seed}.json")
+    if not os.path.exists(path):
+        print(f"Writing {size} synthetic issues to {path}")
+        synthetic.write(path, size, seed)
+    return path
+
+
+def run_suite(sizes, phases, data_dir:str, seed:int, repeat:int):
+    results = []
+    for size in sizes:
+        path = get_dump(data_dir, size, seed)
+        for phase in phases:
+            runs = [run_phase(phase, path, False) for _ in range(repeat)]
+            result = min(runs, key=lambda run: run['seconds'])
+            result |= run_phase(phase, path, True)
+            results.append({'size': size, 'phase': phase} | result)
+            print(f"{size:>9} {phase:<15} {result['seconds']:>9.3f} s {result['peak_bytes'] / 2**20:>9.1f} MB")
+    return {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(current:dict, baseline:dict, time_threshold:float, memory_threshold:float):
+    """
+    Prints the change of every measurement against the baseline and returns
+    the measurements that grew by more than the thresholds (fractions).
+    """
+    base = {(result['size'], result['phase']): result for result in baseline['results']}
+    regressions = []
+    print(f"{'size':>9} {'phase':<15} {'time':>8} {'memory':>8}")
+    for result in current['results']:
+        key = (result['size'], result['phase'])
+        if key not in base:
+            continue
+        time_ratio = result['seconds'] / max(base[key]['seconds'], 1e-9)
+        memory_ratio = result['peak_bytes'] / max(base[key]['peak_bytes'], 1)
+        flags = []
+        if time_ratio > 1 + time_threshold:
+            flags.append('time')
+        if memory_ratio > 1 + memory_threshold:
+            flags.append('memory')
+        if flags:
+            regressions.append({'size': key[0], 'phase': key[1], 'regressed': flags,
+                                'time_ratio': time_ratio, 'memory_ratio': memory_ratio})
+        print(f"{key[0]:>9} {key[1]:<15} {time_ratio:>7.2f}x {memory_ratio:>7.2f}x {' REGRESSION: ' + ', '.join(flags) if flags else ''}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser("suite")
+    ap.add_argument('--sizes', '-n', type=int, nargs='+', default=DEFAULT_SIZES,
+                    help='Numbers of synthetic issues, e.g. 1000 10000 100000 1000000')
+    ap.add_argument('--phases', type=str, nargs='+', default=PHASES, choices=PHASES,
+                    help='Phases to measure')
+    ap.add_argument('--repeat', type=int, default=3,
+                    help='Timed runs per phase, the fastest is reported')
+    ap.add_argument('--seed', type=int, default=611,
+                    help='Seed of the synthetic dumps')
+    ap.add_argument('--data-dir', type=str,
+                    help='Folder keeping the synthetic dumps between runs (default: a temporary folder)')
+    ap.add_argument('--output', type=str, default='benchmark_results.json',
+                    help='JSON file the results are written to')
+    ap.add_argument('--baseline', type=str,
+                    help='Results of an earlier run to compare against')
+    ap.add_argument('--time-threshold', type=float, default=0.2,
+                    help='Allowed relative increase of the time against the baseline')
+    ap.add_argument('--memory-threshold', type=float, default=0.1,
+                    help='Allowed relative increase of the peak memory against the baseline')
+    # Used by the suite itself to measure one phase in a fresh process
+    ap.add_argument('--child', type=str, choices=PHASES, help=argparse.SUPPRESS)
+    ap.add_argument('--data', type=str, help=argparse.SUPPRESS)
+    ap.add_argument('--trace', action='store_true', help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.data, args.trace)))
+        return
+
+    print(f"{'size':>9} {'phase':<15} {'time':>11} {'peak memory':>12}")
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+        current = run_suite(args.sizes, args.phases, args.data_dir, args.seed, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as data_dir:
+            current = run_suite(args.sizes, args.phases, data_dir, args.seed, args.repeat)
+    with open(args.output, 'w') as fout:
+        json.dump(current, fout, indent=2)
+    print(f"Wrote results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as fin:
+            baseline = json.load(fin)
+        regressions = compare(current, baseline, args.time_threshold, args.memory_threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.baseline}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Deterministic generator of synthetic issue dumps shaped like the poetry
+export: same fields, 'category/sublabel' labels, events with closed and
+reopened cycles, and ISO-8601 dates.
+
+    python -m benchmarks.synthetic --count N --output PATH [--seed S]
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+LABELS = {
+    'kind': ['bug', 'feature', 'question', 'enhancement', 'documentation'],
+    'area': ['installer', 'solver', 'cli', 'docs', 'build-system', 'publishing', 'venv', 'plugin-api', 'config'],
+    'status': ['triage', 'confirmed', 'duplicate', 'wontfix', 'waiting-on-response'],
+}
+# Labels without a category, as found in the real dump
+PLAIN_LABELS = ['good first issue', 'Hacktoberfest']
+EVENT_TYPES = ['commented', 'labeled', 'unlabeled', 'mentioned', 'subscribed', 'assigned', 'cross-referenced']
+
+START_DATE = datetime(2018, 2, 28, tzinfo=timezone.utc)
+END_DATE = datetime(2025, 10, 1, tzinfo=timezone.utc)
+
+
+def _date(value:datetime):
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def generate_issue(rnd:random.Random, number:int, users:list):
+    span = int((END_DATE - START_DATE).total_seconds())
+    created = START_DATE + timedelta(seconds=rnd.randrange(span))
+    # A few users open most issues, like in the real project
+    creator = users[min(int(rnd.paretovariate(1.2)) - 1, len(users) - 1)]
+
+    labels = []
+    for category, sublabels in LABELS.items():
+        if rnd.random() < 0.75:
+            labels.append(f"{category}/{rnd.choice(sublabels)}")
+    if rnd.random() < 0.05:
+        labels.append(rnd.choice(PLAIN_LABELS))
+
+    events = [{'event_type': 'labeled', 'author': creator, 'event_date': _date(created), 'label': label}
+              for label in labels]
+    date = created
+    state = 'open'
+    for _ in range(rnd.randint(0, 8)):
+        date = min(date + timedelta(seconds=int(rnd.expovariate(1 / (20 * 86400)))), END_DATE)
+        if state == 'open' and rnd.random() < 0.25:
+            event_type = 'closed'
+        elif state == 'closed' and rnd.random() < 0.3:
+            event_type = 'reopened'
+        else:
+            event_type = rnd.choice(EVENT_TYPES)
+        event = {'event_type': event_type, 'author': rnd.choice(users), 'event_date': _date(date)}
+        if event_type == 'commented':
+            event['comment'] = ' '.join(rnd.choice(['poetry', 'install', 'lock', 'fails', 'works', 'thanks', 'version'])
+                                        for _ in range(rnd.randint(3, 40)))
+        events.append(event)
+        if event_type in ('closed', 'reopened'):
+            state = 'closed' if event_type == 'closed' else 'open'
+
+    return {
+        'url': f"https://github.com/python-poetry/poetry/issues/{number}",
+        'creator': creator,
+        'labels': labels,
+        'state': state,
+        'assignees': [rnd.choice(users)] if rnd.random() < 0.1 else [],
+        'title': f"Synthetic issue {number}",
+        'text': ' '.join(rnd.choice(['poetry', 'lock', 'dependency', 'resolver', 'error', 'python']) for _ in range(rnd.randint(5, 120))),
+        'number': number,
+        'created_date': _date(created),
+        'updated_date': _date(date),
+        'timeline_url': f"https://api.github.com/repos/python-poetry/poetry/issues/{number}/timeline",
+        'events': events,
+    }
+
+
+def generate(count:int, seed:int=611):
+    """
+    Yields `count` issues. The same count and seed always give the same issues.
+    """
+    rnd = random.Random(seed)
+    users = [f"user{i}" for i in range(max(50, count // 5))]
+    for number in range(1, count + 1):
+        yield generate_issue(rnd, number, users)
+
+
+def write(path:str, count:int, seed:int=611):
+    """
+    Writes a synthetic dump with `count` issues to path, one issue at a time.
+    """
+    with open(path, 'w') as fout:
+        fout.write('[')
+        for i, issue in enumerate(generate(count, seed)):
+            if i:
+                fout.write(',\n')
+            json.dump(issue, fout)
+        fout.write(']')
+
+
+def main():
+    ap = argparse.ArgumentParser("synthetic")
+    ap.add_argument('--count', '-n', type=int, required=True,
+                    help='Number of issues to generate')
+    ap.add_argument('--output', type=str, required=True,
+                    help='Path of the JSON file to write')
+    ap.add_argument('--seed', type=int, default=611,
+                    help='Seed of the generator')
+    args = ap.parse_args()
+    write(args.output, args.count, args.seed)
+    print(f"Wrote {args.count} issues to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,385 @@
+"""
+Columnar on-disk format of the dataset: a folder of fixed-width arrays
+that are memory-mapped when opened, so opening it takes the same time for
+any number of issues and nothing is parsed or unpickled.
+
+    dataset.json             format version, dictionaries and dataset values
+    number.npy               int64 issue numbers
+    state.npy                int8 codes into the 'state' dictionary
+    creator.npy              int32 codes into the 'creator' dictionary (-1 for none)
+    repository.npy           int32 codes into the 'repository' dictionary (-1 for none)
+    <date>.npy               int64 microseconds since the epoch (the int64
+                             minimum, NaT, for missing dates)
+    label_offsets.npy        int64, the labels of issue i are the rows
+                             label_offsets[i]:label_offsets[i + 1]
+    label_category.npy       int32 codes into the 'category' dictionary
+    label_sublabel.npy       int32 codes into the 'sublabel' dictionary (-1 for none)
+    interval_offsets.npy     int64, the open periods of issue i are the rows
+                             interval_offsets[i]:interval_offsets[i + 1]
+    interval_opened.npy      int64 microseconds the period started
+    interval_closed.npy      int64 microseconds the period ended (the int64
+                             minimum while still open)
+
+The dictionaries are sorted, like the categories pandas infers, so the
+tables built from the arrays equal the ones built from the issues (see
+frames.py). Events, titles and texts are not stored, the analyses only
+need the summaries above and the open periods derived from the closed and
+reopened events.
+
+    python run.py --export-columnar DATASET_FOLDER
+    ENPM611_PROJECT_DATA_PATH=DATASET_FOLDER python run.py --feature 1
+"""
+
+import copy
+import json
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from aggregates import Aggregates, repository_of
+from frames import STATE_DTYPE
+from model import State
+from timestamps import CACHE_SIZE, EPOCH, MISSING, from_epoch_us, to_epoch_us
+
+FORMAT_VERSION = 2
+METADATA_FILE = 'dataset.json'
+DATE_COLUMNS = ['created_date', 'updated_date', 'closed_date', 'latest_closed_date', 'latest_reopened_date', 'max_event_date']
+ISSUE_COLUMNS = ['number', 'state', 'creator', 'repository'] + DATE_COLUMNS
+# Columns of codes by dictionary, re-encoded when issues are selected
+CODED_COLUMNS = {'creator': 'creator', 'repository': 'repository', 'label_category': 'category', 'label_sublabel': 'sublabel'}
+
+
+def write(folder:str, loader):
+    """
+    Writes the issues of the loader, and the values identifying and
+    describing them, as a columnar dataset. Returns the number of issues.
+    """
+    issues = loader.get_issues()
+    labels = [label for issue in issues for label in issue.labels]
+    intervals = [issue.get_open_intervals() for issue in issues]
+    periods = [period for issue_periods in intervals for period in issue_periods]
+    dictionaries = {
+        'state': [state.value for state in State],
+        'creator': sorted({issue.creator for issue in issues if issue.creator is not None}),
+        'repository': sorted({repository_of(issue.url) for issue in issues} - {None}),
+        'category': sorted({label.category for label in labels}),
+        'sublabel': sorted({label.sublabel for label in labels if label.sublabel is not None}),
+    }
+    codes = {name: {value: code for code, value in enumerate(values)} for name, values in dictionaries.items()}
+
+    def encode(name, values, dtype):
+        return np.fromiter((codes[name].get(value, -1) for value in values), dtype=dtype, count=len(values))
+
+    columns = {
+        'number': np.fromiter((issue.number for issue in issues), dtype=np.int64, count=len(issues)),
+        'state': encode('state', [issue.state.value for issue in issues], np.int8),
+        'creator': encode('creator', [issue.creator for issue in issues], np.int32),
+        'repository': encode('repository', [repository_of(issue.url) for issue in issues], np.int32),
+        'label_offsets': np.cumsum([0] + [len(issue.labels) for issue in issues], dtype=np.int64),
+        'label_category': encode('category', [label.category for label in labels], np.int32),
+        'label_sublabel': encode('sublabel', [label.sublabel for label in labels], np.int32),
+        'interval_offsets': np.cumsum([0] + [len(issue_periods) for issue_periods in intervals], dtype=np.int64),
+        'interval_opened': np.fromiter((to_epoch_us(opened) for opened, _ in periods), dtype=np.int64, count=len(periods)),
+        'interval_closed': np.fromiter((to_epoch_us(closed) for _, closed in periods), dtype=np.int64, count=len(periods)),
+    }
+    for name in DATE_COLUMNS:
+        columns[name] = np.fromiter((to_epoch_us(getattr(issue, name)) for issue in issues), dtype=np.int64, count=len(issues))
+
+    os.makedirs(folder, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(folder, f"{name}.npy"), values)
+    migration_date = loader.get_migration_date()
+    metadata = {
+        'version': FORMAT_VERSION,
+        'issue_count': len(issues),
+        'label_count': len(labels),
+        # The fingerprint of the source, so results cached for it are reused
+        'sha256': loader.get_fingerprint(),
+        'deltas': [],
+        'repository': loader.get_aggregates().get_repository(),
+        'migration_date': migration_date.isoformat() if migration_date else None,
+        'label_categories': loader.get_label_categories(),
+        'year_range': loader.get_year_range(),
+        'dictionaries': dictionaries,
+    }
+    # Written last, a folder without it is not a dataset
+    with open(os.path.join(folder, METADATA_FILE), 'w') as fout:
+        json.dump(metadata, fout, indent=2)
+    return len(issues)
+
+
+class ColumnarDataset:
+    """
+    A columnar dataset opened from its folder. The arrays are memory-mapped
+    read-only when first used.
+    """
+
+    def __init__(self, folder:str):
+        self.folder:str = folder
+        with open(os.path.join(folder, METADATA_FILE), 'r') as fin:
+            self.metadata:dict = json.load(fin)
+        if self.metadata.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{folder} has columnar format version {self.metadata.get('version')}, expected {FORMAT_VERSION}")
+        if self.metadata['migration_date'] is not None:
+            self.metadata['migration_date'] = datetime.fromisoformat(self.metadata['migration_date'])
+        self.dictionaries:dict = self.metadata['dictionaries']
+        self._columns:dict = {}
+
+    def column(self, name:str) -> np.ndarray:
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.folder, f"{name}.npy"), mmap_mode='r')
+        return self._columns[name]
+
+    def categorical(self, name:str, dictionary:str, dtype=None):
+        codes = self.column(name)
+        return pd.Categorical.from_codes(codes, dtype=dtype or pd.CategoricalDtype(self.dictionaries[dictionary]))
+
+    def dates(self, name:str) -> pd.Series:
+        """
+        Returns the date column as UTC datetimes. Only attaching the time
+        zone copies the array.
+        """
+        return pd.Series(self.column(name).view('datetime64[us]'), copy=False).dt.tz_localize('UTC')
+
+    def select(self, issue_filter) -> 'ColumnarDataset':
+        """
+        Returns the dataset of the issues matching the filter (see
+        filters.py), its arrays copied into memory. The dictionaries keep
+        the values of the selected issues only and the dataset values are
+        computed from them, as when filtering the data file, except the
+        migration date, which stays the latest date of the whole dataset.
+        """
+        if issue_filter.user is not None:
+            raise ValueError(f"Columnar datasets have no assignees and can't be filtered by user, export the data file "
+                             f"filtered by --user {issue_filter.user} instead")
+        keep = np.ones(self.metadata['issue_count'], dtype=bool)
+        if issue_filter.state is not None:
+            keep &= self.column('state') == self.dictionaries['state'].index(issue_filter.state)
+        if issue_filter.start is not None:
+            created = self.column('created_date')
+            keep &= (created >= to_epoch_us(issue_filter.start)) & (created < to_epoch_us(issue_filter.end))
+        label_issues = self.label_issues()
+        interval_issues = self.row_issues('interval_offsets')
+        if issue_filter.label is not None:
+            categories, sublabels = self.dictionaries['category'], self.dictionaries['sublabel'] + [None]
+            matching = np.array([[issue_filter.matches_label(category, f"{category}/{sublabel}" if sublabel else category)
+                                  for sublabel in sublabels] for category in categories], dtype=bool).reshape(len(categories), len(sublabels))
+            rows = matching[self.column('label_category'), self.column('label_sublabel')]
+            keep &= np.bincount(label_issues[rows], minlength=len(keep)) > 0
+        kept_labels = keep[label_issues]
+        kept_intervals = keep[interval_issues]
+
+        selected = copy.copy(self)
+        selected._columns = {name: np.asarray(self.column(name))[keep] for name in ISSUE_COLUMNS}
+        selected._columns |= {name: np.asarray(self.column(name))[kept_labels] for name in ['label_category', 'label_sublabel']}
+        selected._columns |= {name: np.asarray(self.column(name))[kept_intervals] for name in ['interval_opened', 'interval_closed']}
+        for name in ['label_offsets', 'interval_offsets']:
+            selected._columns[name] = np.concatenate([[0], np.cumsum(np.diff(self.column(name))[keep])]).astype(np.int64)
+        selected.dictionaries = dict(self.dictionaries)
+        for name, dictionary in CODED_COLUMNS.items():
+            codes = selected._columns[name]
+            used = np.unique(codes[codes >= 0])
+            recoded = np.full(len(self.dictionaries[dictionary]) + 1, -1, dtype=codes.dtype)
+            recoded[used] = np.arange(len(used), dtype=codes.dtype)
+            # -1 (none) stays -1 through the last entry
+            selected._columns[name] = recoded[codes]
+            selected.dictionaries[dictionary] = [self.dictionaries[dictionary][code] for code in used.tolist()]
+
+        repositories = selected._columns['repository']
+        repository_counts = np.bincount(repositories[repositories >= 0], minlength=len(selected.dictionaries['repository']))
+        created = selected._columns['created_date']
+        created = created[created != MISSING]
+        years = created.view('datetime64[us]').astype('datetime64[Y]').astype(np.int64) + 1970
+        selected.metadata = self.metadata | {
+            'issue_count': int(keep.sum()),
+            'label_count': int(kept_labels.sum()),
+            'repository': selected.dictionaries['repository'][int(repository_counts.argmax())] if repository_counts.any() else None,
+            'label_categories': [selected.dictionaries['category'][code] for code in np.unique(selected._columns['label_category']).tolist()],
+            'year_range': [str(each) for each in range(int(years.min()), int(years.max()) + 1)] if len(years) else [],
+            'dictionaries': selected.dictionaries,
+        }
+        return selected
+
+    def label_issues(self) -> np.ndarray:
+        """
+        Returns the issue row of each label row, expanded from the offsets.
+        """
+        return self.row_issues('label_offsets')
+
+    def row_issues(self, offsets_name:str) -> np.ndarray:
+        """
+        Returns the issue row of each row of the arrays split by the offsets.
+        """
+        offsets = self.column(offsets_name)
+        return np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+
+
+def build_issue_frame(dataset:ColumnarDataset):
+    """
+    The issue table of frames.build_issue_frame, from the arrays.
+    """
+    return pd.DataFrame({
+        'number': dataset.column('number'),
+        'state': dataset.categorical('state', 'state', STATE_DTYPE),
+        'creator': dataset.categorical('creator', 'creator'),
+    } | {name: dataset.dates(name) for name in DATE_COLUMNS}, copy=False)
+
+
+def build_label_frame(dataset:ColumnarDataset):
+    """
+    The label table of frames.build_label_frame, from the arrays.
+    """
+    return pd.DataFrame({
+        'issue': dataset.label_issues(),
+        'category': dataset.categorical('label_category', 'category'),
+        'sublabel': dataset.categorical('label_sublabel', 'sublabel'),
+    }, copy=False)
+
+
+def build_aggregates(dataset:ColumnarDataset):
+    """
+    Builds the aggregates (see aggregates.py) from the arrays, counting the
+    values of all issues at once with numpy and only converting the
+    distinct values to Python objects.
+    """
+    dictionaries = dataset.dictionaries
+    states = np.asarray(dataset.column('state'))
+    created, closed, max_event = (np.asarray(dataset.column(name)) for name in ['created_date', 'closed_date', 'max_event_date'])
+    is_open = states == dictionaries['state'].index(State.open.value)
+    # Closed dates only count for the closed issues
+    closed = np.where(states == dictionaries['state'].index(State.closed.value), closed, MISSING)
+    created_days, closed_days = _days(created), _days(closed)
+    has_created = created != MISSING
+    label_issues = dataset.label_issues()
+    label_category, label_sublabel = np.asarray(dataset.column('label_category')), np.asarray(dataset.column('label_sublabel'))
+    state_names = dictionaries['state']
+    categories, sublabels = dictionaries['category'], dictionaries['sublabel'] + [None]
+    repositories = dictionaries['repository'] + [None]
+
+    aggregates = Aggregates()
+    aggregates.issue_count = len(states)
+    aggregates.states = _counter(lambda state: state_names[state], states)
+    for values, counts in [(aggregates.max_event_dates, _counter(from_epoch_us, max_event[max_event != MISSING])),
+                           (aggregates.created_dates, _counter(_date, created_days[has_created])),
+                           (aggregates.closed_dates, _counter(_date, closed_days[closed != MISSING])),
+                           (aggregates.years, _counter(int, _years(created_days[has_created])))]:
+        for value, count in counts.items():
+            values.add(value, count)
+    aggregates.categories = _counter(lambda category: categories[category], label_category)
+    for category, sublabel, count in _count_rows(label_category, label_sublabel):
+        aggregates.sublabels[categories[category]][sublabels[sublabel]] = count
+    months = _months(created_days[label_issues])
+    dated = has_created[label_issues]
+    for category, month, sublabel, count in _count_rows(label_category[dated], months[dated], label_sublabel[dated]):
+        aggregates.monthly[categories[category]][(int(month // 12) + 1970, int(month % 12) + 1, sublabels[sublabel])] = count
+
+    # +1 on the first day starting in each open period and -1 on the day
+    # after it ends, repeated for every label row of its issue
+    interval_issues = dataset.row_issues('interval_offsets')
+    opened, ended = np.asarray(dataset.column('interval_opened')), np.asarray(dataset.column('interval_closed'))
+    still_open = ended == MISSING
+    change_issues = np.stack([interval_issues, interval_issues], axis=1).ravel()
+    change_days = np.stack([-(-opened // DAY_US), _days(ended) + 1], axis=1).ravel()
+    changes = np.stack([np.ones(len(opened), dtype=np.int64), np.where(still_open, 0, -1)], axis=1).ravel()
+    change_offsets = np.concatenate([[0], np.cumsum(np.bincount(change_issues, minlength=len(states)))])
+    label_changes = np.diff(change_offsets)[label_issues]
+    rows = np.repeat(np.arange(len(label_issues)), label_changes)
+    change_rows = change_offsets[label_issues][rows] + np.arange(len(rows)) - np.repeat(np.cumsum(label_changes) - label_changes, label_changes)
+    for category, sublabel, day, count in _count_rows(label_category[rows], label_sublabel[rows], change_days[change_rows],
+                                                      weights=changes[change_rows]):
+        aggregates.open_days[categories[category]][(sublabels[sublabel], _date(day))] = count
+
+    # Created dates of the open issues and durations of the closed ones in
+    # days, with None (MISSING) without a created date
+    has_value = is_open | (closed != MISSING)
+    values = np.where(is_open, created, (closed - created) // DAY_US)
+    values = np.where(has_created, values, MISSING)
+    aggregates.open_created = _counter(from_epoch_us, values[is_open])
+    aggregates.closed_durations = _counter(_int, values[has_value & ~is_open])
+    # The sublabels of each issue in each category, in label order: the rows
+    # sorted by issue and category, one padded row of sublabels per group
+    rows = np.flatnonzero(has_value[label_issues])
+    rows = rows[np.lexsort((rows, label_category[rows], label_issues[rows]))]
+    groups = label_issues[rows] * len(categories) + label_category[rows]
+    starts = np.flatnonzero(np.concatenate([[True], groups[1:] != groups[:-1]]))
+    lengths = np.diff(np.append(starts, len(rows)))
+    padding = len(sublabels)
+    sequences = np.full((len(starts), lengths.max(initial=0)), padding, dtype=np.int64)
+    sequences[np.repeat(np.arange(len(starts)), lengths), np.arange(len(rows)) - np.repeat(starts, lengths)] = label_sublabel[rows]
+    if len(starts):
+        distinct, sequence_ids = np.unique(sequences, axis=0, return_inverse=True)
+        # The groups in the order of their first label row
+        first = np.sort(rows[starts])
+        order = np.argsort(rows[starts], kind='stable')
+        issues = label_issues[first]
+        names = [tuple(sublabels[each] for each in sequence if each != padding) for sequence in distinct.tolist()]
+        open_state = state_names.index(State.open.value)
+        for category, state, sequence, value, count in _count_rows(label_category[first], states[issues],
+                                                                   sequence_ids.ravel()[order], values[issues]):
+            value = from_epoch_us(value) if state == open_state else _int(value)
+            aggregates.labeled_states[categories[category]][(state_names[state], names[sequence], value)] = count
+    aggregates.repositories = _counter(lambda repository: repositories[repository], np.asarray(dataset.column('repository')))
+    return aggregates
+
+
+DAY_US = 24 * 60 * 60 * 10**6
+
+
+def _days(values:np.ndarray) -> np.ndarray:
+    """
+    Days since the epoch of the microsecond dates (MISSING stays MISSING).
+    """
+    return np.where(values == MISSING, MISSING, values // DAY_US)
+
+
+def _years(days:np.ndarray) -> np.ndarray:
+    return days.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970
+
+
+def _months(days:np.ndarray) -> np.ndarray:
+    """
+    Months since January 1970 of the days.
+    """
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _date(day):
+    """
+    The date of a day since the epoch, None for MISSING.
+    """
+    return None if day == MISSING else EPOCH.date() + timedelta(days=int(day))
+
+
+def _int(value):
+    return None if value == MISSING else int(value)
+
+
+def _count_rows(*columns, weights=None):
+    """
+    Yields each distinct row of the columns with its count (or the sum of
+    its weights), in the order the rows first appear, skipping zero totals.
+    The rows are counted as one int64 key combining the codes of the
+    distinct values of every column.
+    """
+    if not len(columns[0]):
+        return
+    values, codes = zip(*(np.unique(column, return_inverse=True) for column in columns))
+    shape = [len(each) for each in values]
+    keys, first, inverse = np.unique(np.ravel_multi_index(codes, shape), return_index=True, return_inverse=True)
+    counts = np.bincount(inverse, weights=weights, minlength=len(keys)).astype(np.int64)
+    order = np.argsort(first, kind='stable')
+    order = order[counts[order] != 0]
+    rows = np.unravel_index(keys[order], shape)
+    yield from zip(*(each[row].tolist() for each, row in zip(values, rows)), counts[order].tolist())
+
+
+def _counter(convert, values:np.ndarray) -> Counter:
+    """
+    Counts the distinct values, converted to Python objects.
+    """
+    return Counter({convert(value): count for value, count in _count_rows(values)})
@@ -1,88 +1,842 @@
 
+import glob
 import json
-from typing import List
+import multiprocessing
+import os
+from typing import Iterator, List
 
 import config
+import profiling
+import snapshot
+# frames, indexes and parallel_loader import pandas and numpy, so they are
+# imported when first used to keep validating the arguments fast
+from aggregates import Aggregates
+from filters import IssueFilter
 from model import Issue
+from timestamps import parse_timestamp
 from datetime import datetime
 from functools import reduce
 
 # Store issues as singleton to avoid reloads
 _ISSUES:List[Issue] = None
 _MIGRATION_DATE:datetime = None
+# Latest event date of every issue of the data file, recorded while filtering
+_DATASET_MIGRATION_DATE:datetime = None
 _LABEL_CATEGORY_LIST:List[str] = None
 _YEAR_RANGE:List[int] = None
+# Columnar tables and indexes built from the issues (or the aggregates), by name
+_FRAMES:dict = {}
+# Content hash of the data file
+_FINGERPRINT:str = None
+# Header of a snapshot that matches the data file, if any
+_SNAPSHOT_HEADER:dict = None
+# Metadata sidecar that matches the data file and the snapshot, if any
+_METADATA:dict = None
+# Columnar dataset the data path points to, if any
+_COLUMNAR = None
+# Aggregates of the issues, updated when a delta is ingested
+_AGGREGATES:Aggregates = None
+# Content hashes of the delta files applied on top of the data file
+_DELTAS:List[str] = None
+# With several data files: the values and aggregates of each one, in the
+# order of the data files, their values alone (possibly from the metadata
+# sidecars) and the merged aggregates by repository (None for all of them)
+_SHARDS:List[dict] = None
+_SHARD_VALUES:List[dict] = None
+_MERGED:dict = {}
+
+# Number of characters read at a time when streaming the data file
+STREAM_CHUNK_SIZE = 1 << 16
 
 class DataLoader:
     """
     Loads the issue data into a runtime object.
     """
-    
-    def __init__(self):
+
+    def __init__(self, streaming:bool=None, data_path:str=None, shard:bool=False):
         """
-        Constructor
+        Constructor. In streaming mode the migration date, label categories
+        and year range are computed in a single pass over the data file
+        instead of loading all issues, unless a snapshot already has them.
+
+        The data path is a file, a glob pattern or a list of those. Several
+        data files (e.g. one per repository or per year) are loaded as
+        shards: each one on its own in a worker process, keeping only its
+        aggregates, which are merged by repository or all together. No
+        issue of a shard may match the filter, only of all of them.
         """
-        self.data_path:str = config.get_parameter('ENPM611_PROJECT_DATA_PATH')
-        
+        self.data_paths:List[str] = get_data_paths(data_path or config.get_parameter('ENPM611_PROJECT_DATA_PATH'))
+        self.data_path:str = self.data_paths[0]
+        self.sharded:bool = len(self.data_paths) > 1
+        # A folder written by --export-columnar, opened memory-mapped without Issue objects (see columnar.py)
+        self.columnar:bool = bool(self.data_path) and os.path.isdir(self.data_path)
+        if streaming is None:
+            streaming = bool(config.get_parameter('ENPM611_PROJECT_STREAMING'))
+        self.streaming:bool = streaming
+        self.snapshot_path:str = snapshot.get_snapshot_path(self.data_path)
+        self.metadata_path:str = snapshot.get_metadata_path(self.data_path)
+        # --no-cache skips the snapshot, --rebuild-cache ignores the existing one
+        self.use_snapshot:bool = not config.get_parameter('no_cache')
+        self.rebuild_snapshot:bool = bool(config.get_parameter('rebuild_cache'))
+        # Number of processes building the issues, 1 builds them in this process
+        self.load_workers:int = int(config.get_parameter('ENPM611_PROJECT_LOAD_WORKERS', 1))
+        # Number of processes loading the shards
+        self.shard_workers:int = int(config.get_parameter('ENPM611_PROJECT_SHARD_WORKERS', os.cpu_count() or 1))
+        # --user, --label, --year and --state select the issues to load. The
+        # snapshot and metadata sidecar hold every issue, so with a filter
+        # they are only read, and the derived values come from the kept issues
+        self.filter:IssueFilter = IssueFilter.from_config()
+        self.shard:bool = shard
+
     def get_issues(self):
         """
         This should be invoked by other parts of the application to get access
         to the issues in the data file.
         """
         global _ISSUES # to access it within the function
+        if self.sharded:
+            raise ValueError(f"The {len(self.data_paths)} data files are only loaded as aggregates, "
+                             "run the analyses needing all issues on one data file")
+        if self.columnar:
+            raise ValueError(f"The columnar dataset {self.data_path} has no issues, only their tables and aggregates")
         if _ISSUES is None:
-            _ISSUES = self._load()
-            print(f'Loaded {len(_ISSUES)} issues from {self.data_path}.')
+            header = self._get_snapshot_header()
+            if header is not None:
+                with profiling.phase('loader.read_snapshot'):
+                    _ISSUES = snapshot.read_issues(self.snapshot_path)
+                print(f'Loaded {len(_ISSUES)} issues from {self.snapshot_path}.')
+                if header['deltas']:
+                    print(f"Including {len(header['deltas'])} ingested delta(s).")
+                if self.filter is not None:
+                    # Already built, so filtered after loading
+                    count = len(_ISSUES)
+                    _ISSUES = [issue for issue in _ISSUES if self.filter.matches(issue)]
+                    self._report_filtered(len(_ISSUES), count - len(_ISSUES))
+                elif header['mtime_ns'] is None:
+                    # Data file was touched but not changed, refresh the fingerprint
+                    self._write_snapshot(snapshot.fingerprint(self.data_path, header['sha256']))
+            else:
+                write_snapshot = self.use_snapshot and self.filter is None
+                data_fingerprint = snapshot.fingerprint(self.data_path) if write_snapshot else None
+                _ISSUES = self._load()
+                print(f'Loaded {len(_ISSUES)} issues from {self.data_path}.')
+                if write_snapshot:
+                    self._write_snapshot(data_fingerprint)
+            if profiling.enabled():
+                profiling.count('issues', len(_ISSUES))
+                profiling.count('labels', sum(len(issue.labels) for issue in _ISSUES))
+                profiling.count('events', sum(issue.event_count for issue in _ISSUES))
         return _ISSUES
-    
-    def get_migration_date(self):
+
+    def iter_issues(self, repository:str=None) -> Iterator[Issue]:
+        """
+        Yields the issues one at a time. If the issues haven't been loaded
+        yet, the data file is parsed incrementally so only the issue being
+        yielded is kept in memory. With several data files, they are parsed
+        one after the other, only those of the repository if given.
+        """
+        global _DATASET_MIGRATION_DATE, _MIGRATION_DATE
+        if _ISSUES is not None:
+            yield from _ISSUES
+            return
+        if self.columnar:
+            raise ValueError(f"The columnar dataset {self.data_path} has no issues, only their tables and aggregates")
+        data_paths = self.data_paths
+        if self.sharded and repository is not None:
+            data_paths = [shard['path'] for shard in self._get_shard_values() if shard['repository'] == repository]
+        materialized = skipped = 0
+        record_date = self.filter is not None and self._get_dataset_values() is None
+        latest = latest_record = None
+        for data_path in data_paths:
+            with open(data_path,'r') as fin:
+                for jobj in _iter_json_array(fin):
+                    if self.filter is None or self.filter.matches_record(jobj):
+                        materialized += 1
+                        issue = Issue(jobj)
+                        latest = _latest(latest, issue.max_event_date)
+                        yield issue
+                    else:
+                        skipped += 1
+                        if record_date:
+                            latest_record = _latest_record_date(latest_record, jobj)
+        if self.filter is not None:
+            if record_date:
+                _DATASET_MIGRATION_DATE = _latest(latest, parse_timestamp(latest_record))
+            self._report_filtered(materialized, skipped)
+        elif not self.sharded and _MIGRATION_DATE is None:
+            # Every issue went by, so the migration date needs no other pass
+            _MIGRATION_DATE = latest
+
+    def get_fingerprint(self):
+        """
+        Returns the content hash of the data file and the ingested deltas,
+        identifying the dataset. Taken from the snapshot when it matches the
+        data file, so the data file is only hashed when there is no usable
+        snapshot.
+        """
+        global _FINGERPRINT
+        if self.sharded:
+            fingerprints = [shard['fingerprint'] for shard in self._get_shard_values()]
+            return snapshot.dataset_hash(fingerprints[0], fingerprints[1:])
+        if _FINGERPRINT is None:
+            header = self._get_cached_values() or self._get_snapshot_header()
+            content_hash = header['sha256'] if header is not None else snapshot.hash_file(self.data_path)
+            # The filtered issues are another dataset
+            deltas = self._get_deltas() + ([f"filter {self.filter}"] if self.filter is not None else [])
+            _FINGERPRINT = snapshot.dataset_hash(content_hash, deltas)
+        return _FINGERPRINT
+
+    def get_aggregates(self, repository:str=None):
+        """
+        Returns the aggregates of the issues (see aggregates.py), from the
+        snapshot if possible. With several data files, the aggregates of the
+        data files of the repository are merged, or of all data files.
+        """
+        global _AGGREGATES
+        if repository is not None and repository not in self.get_repositories():
+            raise ValueError(f"Invalid repository '{repository}', expected one of {self.get_repositories()}")
+        if self.sharded:
+            if repository not in _MERGED:
+                shards = [shard['aggregates'] for shard in self.get_shards()
+                          if repository is None or shard['repository'] == repository]
+                with profiling.phase('loader.merge_aggregates'):
+                    _MERGED[repository] = shards[0] if len(shards) == 1 else reduce(Aggregates.merge, shards, Aggregates())
+            return _MERGED[repository]
+        if _AGGREGATES is None:
+            header = self._get_snapshot_header() if _ISSUES is None else _SNAPSHOT_HEADER
+            if self.filter is not None:
+                # The aggregates of the snapshot count every issue
+                header = None
+            if self.columnar:
+                import columnar
+                with profiling.phase('loader.build_aggregates'):
+                    _AGGREGATES = columnar.build_aggregates(self._get_columnar())
+            elif header is not None:
+                with profiling.phase('loader.read_aggregates'):
+                    _AGGREGATES = snapshot.read_aggregates(self.snapshot_path)
+            elif self.streaming and _ISSUES is None:
+                with profiling.phase('loader.build_aggregates'):
+                    _AGGREGATES = Aggregates.from_issues(self.iter_issues())
+            else:
+                issues = self.get_issues()
+                with profiling.phase('loader.build_aggregates'):
+                    _AGGREGATES = Aggregates.from_issues(issues)
+        return _AGGREGATES
+
+    def ingest(self, delta_path:str):
+        """
+        Applies a delta file, a JSON array of new or changed issues, to the
+        loaded issues. Issues are matched by number: changed issues replace
+        the loaded ones, new ones are added. The aggregates and the dataset
+        values are updated for the issues in the delta only, and the result
+        is stored in the snapshot so later runs load it without the delta.
+        Returns the number of new and changed issues.
+        """
+        global _MIGRATION_DATE, _LABEL_CATEGORY_LIST, _YEAR_RANGE, _FINGERPRINT
+        if self.sharded:
+            raise ValueError("Deltas are ingested into one data file at a time")
+        if self.filter is not None:
+            raise ValueError(f"Deltas are ingested into the whole dataset, remove the filter {self.filter}")
+        issues = self.get_issues()
+        aggregates = self.get_aggregates()
+        positions = {issue.number: i for i, issue in enumerate(issues)}
+        with open(delta_path, 'r') as fin:
+            jobjs = json.load(fin)
+        added = changed = 0
+        for jobj in jobjs:
+            issue = Issue(jobj)
+            position = positions.get(issue.number)
+            if position is None:
+                positions[issue.number] = len(issues)
+                issues.append(issue)
+                added += 1
+            else:
+                aggregates.remove(issues[position])
+                issues[position] = issue
+                changed += 1
+            aggregates.add(issue)
+
+        _MIGRATION_DATE = aggregates.get_migration_date()
+        _LABEL_CATEGORY_LIST = aggregates.get_label_categories()
+        _YEAR_RANGE = aggregates.get_year_range()
+        # Tables and indexes are rebuilt from the updated issues when requested
+        _FRAMES.clear()
+        self._get_deltas().append(snapshot.hash_file(delta_path))
+        _FINGERPRINT = None
+        print(f'Ingested {added} new and {changed} changed issues from {delta_path}.')
+        if self.use_snapshot and _SNAPSHOT_HEADER is not None:
+            self._write_snapshot({key: _SNAPSHOT_HEADER[key] for key in ['size', 'mtime_ns', 'sha256']})
+        return added, changed
+
+    def check_consistency(self):
+        """
+        Compares the aggregates and dataset values, which are updated
+        incrementally when deltas are ingested, with a full rebuild from the
+        issues. Returns the names of the values that differ.
+        """
+        rebuilt = Aggregates.from_issues(self.get_issues())
+        differences = self.get_aggregates().differences(rebuilt)
+        if self.get_migration_date() != self.get_issue_frame()['max_event_date'].max().to_pydatetime():
+            differences.append('migration_date')
+        if sorted(self.get_label_categories()) != sorted(rebuilt.get_label_categories()):
+            differences.append('label_categories')
+        if self.get_year_range() != rebuilt.get_year_range():
+            differences.append('year_range')
+        return differences
+
+    def get_issue_frame(self):
+        """
+        Returns the issues as a DataFrame, one row per issue (see frames.py).
+        """
+        if self.columnar:
+            import columnar
+            return self._get_frame('issues', columnar.build_issue_frame)
+        import frames
+        return self._get_frame('issues', frames.build_issue_frame)
+
+    def get_label_frame(self):
+        """
+        Returns the exploded labels as a DataFrame, one row per label of
+        each issue (see frames.py).
+        """
+        if self.columnar:
+            import columnar
+            return self._get_frame('labels', columnar.build_label_frame)
+        import frames
+        return self._get_frame('labels', frames.build_label_frame)
+
+    def get_event_frame(self):
+        """
+        Returns the events as a DataFrame, one row per event of each issue
+        (see frames.py).
+        """
+        if self.columnar:
+            raise ValueError(f"The columnar dataset {self.data_path} has no events")
+        import frames
+        return self._get_frame('events', frames.build_event_frame)
+
+    def get_index(self):
+        """
+        Returns the label, time and state indexes over the issue and label
+        tables, built once (see indexes.py).
+        """
+        if 'index' not in _FRAMES:
+            issue_frame, label_frame = self.get_issue_frame(), self.get_label_frame()
+            import indexes
+            with profiling.phase('loader.build_index'):
+                _FRAMES['index'] = indexes.IssueIndex(issue_frame, label_frame)
+        return _FRAMES['index']
+
+    def get_interval_index(self, category:str, repository:str=None):
+        """
+        Returns the index of the issues of each sublabel of the category open
+        at the start of each day (see indexes.IntervalIndex), built once from the
+        aggregates of the repository or of all data files.
+        """
+        key = ('intervals', category, repository)
+        if key not in _FRAMES:
+            aggregates = self.get_aggregates(repository)
+            import indexes
+            with profiling.phase('loader.build_interval_index'):
+                _FRAMES[key] = indexes.IntervalIndex(aggregates.open_days.get(category, {}))
+        return _FRAMES[key]
+
+    def get_migration_date(self, repository:str=None):
         """
         This should be invoked by other parts of the application to get access
         to the latest date contained in the dataset (to obtain issue age, for example).
-        Returns an aware datetime object
+        Returns an aware datetime object. With several data files, the latest
+        date of the data files of the repository if given.
         """
         global _MIGRATION_DATE # to access it within the function
+        if self.sharded:
+            return max((shard['migration_date'] for shard in self._get_shard_values()
+                        if shard['migration_date'] and repository in (None, shard['repository'])), default=None)
         if _MIGRATION_DATE is None:
-            issues = self.get_issues()
-            _MIGRATION_DATE = max([max([event.event_date for event in issue.events if event.event_date]) for issue in issues])
+            header = self._get_cached_values() if _ISSUES is None else None
+            if self.filter is not None:
+                # A filter selects the analysed issues, the reference date stays the dataset's
+                _MIGRATION_DATE = self._get_dataset_migration_date()
+            elif header is not None:
+                _MIGRATION_DATE = header['migration_date']
+            elif self.streaming and _ISSUES is None:
+                self._scan()
+            elif self.columnar or _AGGREGATES is not None:
+                _MIGRATION_DATE = self.get_aggregates().get_migration_date()
+            else:
+                # The latest of the event dates summarized while loading, without building the issue table
+                _MIGRATION_DATE = reduce(_latest, (issue.max_event_date for issue in self.get_issues()), None)
             print(f"Loaded migration date",_MIGRATION_DATE)
-        return _MIGRATION_DATE 
-    
+        return _MIGRATION_DATE
+
     def get_label_categories(self):
         """
         This returns the categories of labels contained in the dataset as a list.
         """
         global _LABEL_CATEGORY_LIST # to access it within the function
+        if self.sharded:
+            return list(dict.fromkeys(category for shard in self._get_shard_values() for category in shard['label_categories']))
         if _LABEL_CATEGORY_LIST is None:
-            issues = self.get_issues()
-            label_categories = []
-            for issue in issues:
-                label_categories += [label.category for label in issue.labels]
-            _LABEL_CATEGORY_LIST = list(set(label_categories))
+            header = self._get_cached_values() if _ISSUES is None else None
+            if header is not None:
+                _LABEL_CATEGORY_LIST = header['label_categories']
+            elif self.streaming and _ISSUES is None:
+                self._scan()
+            else:
+                issues = self.get_issues()
+                label_categories = []
+                for issue in issues:
+                    label_categories += [label.category for label in issue.labels]
+                _LABEL_CATEGORY_LIST = list(set(label_categories))
             print(f"Loaded label categories")
-        return _LABEL_CATEGORY_LIST 
-    
+        return _LABEL_CATEGORY_LIST
+
     def get_year_range(self):
         """
         This returns the years included in the dataset as a list.
         """
-        global _YEAR_RANGE 
+        global _YEAR_RANGE
+        if self.sharded:
+            years = [int(year) for shard in self._get_shard_values() for year in shard['year_range']]
+            return [str(each) for each in range(min(years), max(years) + 1)] if years else []
         if _YEAR_RANGE is None:
-            issues = self.get_issues()
-            created = [issue.created_date.year for issue in issues]
-            _YEAR_RANGE = [str(each) for each in range(min(created),max(created)+1)]
+            header = self._get_cached_values() if _ISSUES is None else None
+            if header is not None:
+                _YEAR_RANGE = header['year_range']
+            elif self.streaming and _ISSUES is None:
+                self._scan()
+            else:
+                issues = self.get_issues()
+                created = [issue.created_date.year for issue in issues]
+                _YEAR_RANGE = [str(each) for each in range(min(created),max(created)+1)]
             print("Loaded years")
-        return _YEAR_RANGE 
+        return _YEAR_RANGE
+
 
-    
     def _load(self):
         """
         Loads the issues into memory.
         """
-        with open(self.data_path,'r') as fin:
-            return [Issue(i) for i in json.load(fin)]
-    
+        global _DATASET_MIGRATION_DATE
+        with profiling.phase('loader.decode_json'):
+            with open(self.data_path,'r') as fin:
+                jobjs = json.load(fin)
+        latest = latest_record = None
+        if self.filter is not None:
+            # Rejected before their dates and events are parsed. When no
+            # snapshot has the migration date, only the latest of their raw
+            # event dates is kept, and parsed once
+            record_date = self._get_dataset_values() is None
+            with profiling.phase('loader.filter'):
+                count = len(jobjs)
+                kept = []
+                for jobj in jobjs:
+                    if self.filter.matches_record(jobj):
+                        kept.append(jobj)
+                    elif record_date:
+                        latest_record = _latest_record_date(latest_record, jobj)
+                jobjs = kept
+            self._report_filtered(len(jobjs), count - len(jobjs))
+        with profiling.phase('loader.build_issues'):
+            if self.load_workers > 1:
+                import parallel_loader
+                issues = parallel_loader.load(jobjs, self.load_workers)
+            else:
+                issues = [Issue(i) for i in jobjs]
+        if self.filter is not None and record_date:
+            latest = parse_timestamp(latest_record)
+            for issue in issues:
+                latest = _latest(latest, issue.max_event_date)
+            _DATASET_MIGRATION_DATE = latest
+        return issues
+
+    def _get_frame(self, name:str, build):
+        """
+        Builds the named table from the issues (or the columnar dataset) the
+        first time it is requested.
+        """
+        if name not in _FRAMES:
+            source = self._get_columnar() if self.columnar else self.get_issues()
+            with profiling.phase(f'loader.build_{name}_frame'):
+                _FRAMES[name] = build(source)
+        return _FRAMES[name]
+
+    def _scan(self):
+        """
+        Computes the migration date, label categories and year range in a
+        single pass over the streamed issues.
+        """
+        global _MIGRATION_DATE, _LABEL_CATEGORY_LIST, _YEAR_RANGE
+        migration_date = None
+        label_categories = set()
+        min_year = max_year = None
+        for issue in self.iter_issues():
+            if issue.max_event_date and (migration_date is None or issue.max_event_date > migration_date):
+                migration_date = issue.max_event_date
+            label_categories.update(label.category for label in issue.labels)
+            if issue.created_date:
+                year = issue.created_date.year
+                min_year = year if min_year is None else min(min_year, year)
+                max_year = year if max_year is None else max(max_year, year)
+        _MIGRATION_DATE = migration_date if self.filter is None else self._get_dataset_migration_date()
+        _LABEL_CATEGORY_LIST = list(label_categories)
+        _YEAR_RANGE = [str(each) for each in range(min_year,max_year+1)] if min_year is not None else []
+
+    def get_issue_count(self):
+        """
+        Returns the number of issues, from the metadata sidecar if the issues
+        haven't been loaded.
+        """
+        if self.sharded:
+            return sum(shard['issue_count'] for shard in self._get_shard_values())
+        metadata = self._get_metadata() if _ISSUES is None else None
+        if metadata is not None:
+            return metadata['issue_count']
+        return len(self.get_issues())
+
+    def get_repositories(self):
+        """
+        Returns the repositories of the data files, taken from the URLs of
+        their issues or else the data file names.
+        """
+        if self.sharded:
+            return list(dict.fromkeys(shard['repository'] for shard in self._get_shard_values()))
+        metadata = self._get_metadata() if _ISSUES is None else None
+        repository = metadata['repository'] if metadata is not None else self.get_aggregates().get_repository()
+        return [repository or _file_name(self.data_path)]
+
+    def preload(self):
+        """
+        Loads everything the analyses share, e.g. before forking workers
+        that should not each load it again. Sharded data files only have
+        aggregates, and a columnar dataset has no issues to load.
+        """
+        self.get_migration_date()
+        self.get_label_categories()
+        self.get_year_range()
+        if self.sharded:
+            for repository in [None] + self.get_repositories():
+                self.get_aggregates(repository)
+            return
+        if not self.columnar:
+            self.get_issues()
+        self.get_issue_frame()
+        self.get_label_frame()
+        self.get_aggregates()
+        self.get_index()
+
+    def get_shards(self):
+        """
+        Loads the data files as shards and returns the values and aggregates
+        of each one. The data files are loaded concurrently on forked worker
+        processes, each holding the issues of one data file at a time and
+        sending back its aggregates only. Without fork they are loaded one
+        after the other in this process.
+        """
+        global _SHARDS, _SHARD_VALUES
+        if _SHARDS is None:
+            workers = min(self.shard_workers, len(self.data_paths))
+            with profiling.phase('loader.load_shards'):
+                if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+                    from concurrent.futures import ProcessPoolExecutor
+                    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                        _SHARDS = list(pool.map(_load_shard, self.data_paths))
+                else:
+                    _SHARDS = [_load_shard(data_path) for data_path in self.data_paths]
+            _SHARD_VALUES = [{key: value for key, value in shard.items() if key != 'aggregates'} for shard in _SHARDS]
+            print(f"Loaded {sum(shard['issue_count'] for shard in _SHARDS)} issues from {len(_SHARDS)} data files.")
+            if self.filter is not None and not any(shard['issue_count'] for shard in _SHARDS):
+                raise ValueError(f"No issues match the filter {self.filter}")
+        return _SHARDS
+
+    def _get_shard_values(self):
+        """
+        Returns the path, fingerprint, repository, issue count and derived
+        values of each data file, from the metadata sidecars if all of them
+        match their data files, otherwise from the loaded shards.
+        """
+        global _SHARD_VALUES
+        if _SHARD_VALUES is None and self.use_snapshot and not self.rebuild_snapshot and self.filter is None:
+            values = []
+            for data_path in self.data_paths:
+                metadata = snapshot.read_metadata(snapshot.get_metadata_path(data_path), data_path,
+                                                  snapshot.get_snapshot_path(data_path))
+                if metadata is None:
+                    break
+                values.append(_shard_values(data_path, snapshot.dataset_hash(metadata['sha256'], metadata['deltas']),
+                                            metadata['repository'], metadata))
+            else:
+                _SHARD_VALUES = values
+        if _SHARD_VALUES is None:
+            self.get_shards()
+        return _SHARD_VALUES
+
+    def _get_deltas(self):
+        """
+        Returns the content hashes of the deltas applied to the loaded issues.
+        """
+        global _DELTAS
+        if _DELTAS is None:
+            header = (self._get_cached_values() or self._get_snapshot_header()) if _ISSUES is None else _SNAPSHOT_HEADER
+            _DELTAS = list(header['deltas']) if header is not None else []
+        return _DELTAS
+
+    def _get_metadata(self):
+        """
+        Returns the metadata sidecar if it matches the data file and the
+        snapshot, otherwise None.
+        """
+        global _METADATA
+        if self.columnar:
+            return self._get_columnar().metadata
+        if self.filter is not None:
+            return None
+        if not self.use_snapshot or self.rebuild_snapshot:
+            return None
+        if _METADATA is None:
+            _METADATA = snapshot.read_metadata(self.metadata_path, self.data_path, self.snapshot_path)
+        return _METADATA
+
+    def _report_filtered(self, materialized:int, skipped:int):
+        self.filter.report(materialized, skipped)
+        if not materialized and not self.shard:
+            raise ValueError(f"No issues match the filter {self.filter}")
+
+    def _get_columnar(self):
+        """
+        Returns the columnar dataset of the data path, opened once.
+        """
+        global _COLUMNAR
+        if _COLUMNAR is None:
+            import columnar
+            with profiling.phase('loader.open_columnar'):
+                _COLUMNAR = columnar.ColumnarDataset(self.data_path)
+            if self.filter is not None:
+                count = _COLUMNAR.metadata['issue_count']
+                with profiling.phase('loader.filter'):
+                    _COLUMNAR = _COLUMNAR.select(self.filter)
+                self._report_filtered(_COLUMNAR.metadata['issue_count'], count - _COLUMNAR.metadata['issue_count'])
+        return _COLUMNAR
+
+    def _get_dataset_values(self):
+        """
+        Returns the snapshot header, or the metadata of a columnar dataset,
+        holding the values of every issue even when filtering. None if there
+        is no usable snapshot.
+        """
+        return self._get_columnar().metadata if self.columnar else self._get_snapshot_header()
+
+    def _get_dataset_migration_date(self):
+        """
+        Returns the latest event date of every issue, ignoring the filter:
+        from the snapshot, or else recorded while loading the issues.
+        """
+        header = self._get_dataset_values()
+        if header is not None:
+            return header['migration_date']
+        if _DATASET_MIGRATION_DATE is None:
+            if self.streaming and _ISSUES is None:
+                for _ in self.iter_issues():
+                    pass
+            else:
+                self.get_issues()
+        return _DATASET_MIGRATION_DATE
+
+    def _get_cached_values(self):
+        """
+        Returns the metadata sidecar or else the snapshot header, whichever
+        matches the data file first, holding the fingerprint, deltas and
+        derived values of the dataset. None if neither matches, or if the
+        issues of a data file are filtered (the selected issues of a columnar
+        dataset have their own values).
+        """
+        if self.filter is not None and not self.columnar:
+            return None
+        return self._get_metadata() or self._get_snapshot_header()
+
+    def _get_snapshot_header(self):
+        """
+        Returns the header of the snapshot if it can be used for the current
+        data file, otherwise None. A snapshot whose data file was only touched
+        is returned with its 'mtime_ns' cleared so it gets refreshed on load.
+        """
+        global _SNAPSHOT_HEADER
+        if not self.use_snapshot or self.rebuild_snapshot:
+            return None
+        if _SNAPSHOT_HEADER is None:
+            header = snapshot.read_header(self.snapshot_path)
+            status = snapshot.check_header(header, self.data_path)
+            if status == 'touched':
+                header['mtime_ns'] = None
+            if status is not None:
+                _SNAPSHOT_HEADER = header
+        return _SNAPSHOT_HEADER
+
+    def _write_snapshot(self, data_fingerprint:dict):
+        """
+        Stores the loaded issues, their aggregates and the derived values in
+        the snapshot, and the derived values in the metadata sidecar.
+        """
+        global _SNAPSHOT_HEADER, _METADATA
+        if self.filter is not None:
+            # The snapshot holds every issue, never the filtered ones
+            return
+        derived = {
+            'deltas': self._get_deltas(),
+            'migration_date': self.get_migration_date(),
+            'label_categories': self.get_label_categories(),
+            'year_range': self.get_year_range(),
+        }
+        aggregates = self.get_aggregates()
+        try:
+            with profiling.phase('loader.write_snapshot'):
+                _SNAPSHOT_HEADER = snapshot.write(self.snapshot_path, _ISSUES, aggregates, data_fingerprint, **derived)
+                snapshot.write_metadata(self.metadata_path, self.snapshot_path, data_fingerprint,
+                                        issue_count=len(_ISSUES), repository=aggregates.get_repository(), **derived)
+            _METADATA = None
+            self.rebuild_snapshot = False
+            print(f'Wrote snapshot to {self.snapshot_path}.')
+        except OSError as e:
+            print(f'Could not write snapshot to {self.snapshot_path}: {e}')
+
+
+def get_data_paths(value):
+    """
+    Returns the data files of a data path: a file, a glob pattern or a list
+    of those. Glob patterns skip the snapshots and metadata sidecars.
+    """
+    paths = []
+    for each in (value if isinstance(value, list) else [value]):
+        if isinstance(each, str) and glob.has_magic(each):
+            matches = sorted(path for path in glob.glob(each)
+                             if not path.endswith((snapshot.SNAPSHOT_SUFFIX, snapshot.METADATA_SUFFIX)))
+            if not matches:
+                raise FileNotFoundError(f"No data files match {each}")
+            paths += matches
+        else:
+            paths.append(each)
+    return paths
+
+
+def _file_name(data_path:str):
+    return os.path.splitext(os.path.basename(data_path))[0]
+
+
+def _shard_values(data_path:str, fingerprint:str, repository:str, values):
+    """
+    Returns the values of a shard, from its metadata sidecar or aggregates.
+    """
+    return {'path': data_path, 'fingerprint': fingerprint, 'repository': repository or _file_name(data_path),
+            'issue_count': values['issue_count'], 'migration_date': values['migration_date'],
+            'label_categories': values['label_categories'], 'year_range': values['year_range']}
+
+
+def _load_shard(data_path:str):
+    """
+    Worker: loads one data file on its own and returns its values and
+    aggregates. The issues are dropped before the next data file is loaded.
+    """
+    _reset()
+    loader = DataLoader(data_path=data_path, shard=True)
+    aggregates = loader.get_aggregates()
+    shard = _shard_values(data_path, loader.get_fingerprint(), aggregates.get_repository(), {
+        'issue_count': aggregates.issue_count,
+        'migration_date': loader.get_migration_date(),
+        'label_categories': aggregates.get_label_categories(),
+        'year_range': aggregates.get_year_range(),
+    })
+    shard['aggregates'] = aggregates
+    _reset()
+    return shard
+
+
+def _reset():
+    """
+    Drops the issues of the data file and everything loaded from them.
+    """
+    global _ISSUES, _MIGRATION_DATE, _DATASET_MIGRATION_DATE, _LABEL_CATEGORY_LIST, _YEAR_RANGE, _FINGERPRINT, _SNAPSHOT_HEADER, \
+        _METADATA, _COLUMNAR, _AGGREGATES, _DELTAS
+    _ISSUES = _MIGRATION_DATE = _DATASET_MIGRATION_DATE = _LABEL_CATEGORY_LIST = _YEAR_RANGE = _FINGERPRINT = _SNAPSHOT_HEADER = None
+    _METADATA = _COLUMNAR = _AGGREGATES = _DELTAS = None
+    _FRAMES.clear()
+
+
+def _iter_json_array(fin, chunk_size:int=STREAM_CHUNK_SIZE):
+    """
+    Incrementally decodes a top-level JSON array from a text file, yielding
+    its elements one at a time. Only the element being decoded is buffered.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill(size):
+        nonlocal buffer, pos, eof
+        chunk = fin.read(size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def next_char():
+        # Returns the next non-whitespace character, reading more if needed
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos] if pos < len(buffer) else ''
+            fill(chunk_size)
+
+    if next_char() != '[':
+        raise ValueError(f'Expected a JSON array in {fin.name}')
+    pos += 1
+    if next_char() == ']':
+        return
+    read_size = chunk_size
+    while True:
+        next_char()
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+            # A value ending exactly at the buffer end (e.g. a number) may be cut off
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            # Element spans beyond the buffer, grow the reads to stay linear
+            fill(read_size)
+            read_size *= 2
+            continue
+        read_size = chunk_size
+        pos = end
+        yield element
+        separator = next_char()
+        pos += 1
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f'Malformed JSON array in {fin.name} near offset {pos}')
+
+
+def _latest(date:datetime, other:datetime):
+    return other if date is None or (other is not None and other > date) else date
+
+
+def _latest_record_date(date:str, jobj:dict):
+    """
+    Returns the latest of the date and the event dates of the raw JSON
+    record, without parsing them: the ISO 8601 UTC strings of the data file
+    sort like the dates they stand for.
+    """
+    for jevent in jobj.get('events', []):
+        value = jevent.get('event_date')
+        if isinstance(value, str) and (date is None or value > date):
+            date = value
+    return date
+
 
 if __name__ == '__main__':
     # Run the loader for testing
-    DataLoader().get_issues()
\ No newline at end of file
+    DataLoader().get_issues()
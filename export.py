@@ -0,0 +1,144 @@
+"""
+Writes the results of the analyses to a folder instead of showing them, so
+the analyses can run on headless machines.
+
+Each result gets its own subfolder with its aggregated tables (CSV or
+Parquet), its statistics as JSON (if it has any) and its figures (PNG or
+SVG). Figures are rendered with the non-GUI Agg backend from the computed
+result only, so they can be rendered on worker processes. Rendered figures
+of cached results are stored in the result cache.
+"""
+
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import matplotlib
+
+import profiling
+import result_cache
+from result_cache import ResultCache
+
+FIGURE_FORMATS = ['png', 'svg']
+TABLE_FORMATS = ['csv', 'parquet']
+
+
+def result_name(result:dict):
+    """
+    Returns the name of the subfolder of a result, e.g. 'feature2_kind_2023'.
+    """
+    parts = [f"feature{result['feature']}", result.get('repository'), result['category'], result.get('year')]
+    return '_'.join(str(part).replace('/', '-').replace(' ', '-') for part in parts if part is not None)
+
+
+def write_tables(result:dict, folder:str, table_format:str='csv'):
+    """
+    Writes the tables and statistics of the result, returns the written paths.
+    """
+    paths = []
+    for name, table in result['tables'].items():
+        if table_format == 'parquet':
+            path = os.path.join(folder, f"{name}.parquet")
+            try:
+                table.to_parquet(path)
+                paths.append(path)
+                continue
+            except ImportError:
+                # Parquet needs pyarrow or fastparquet, which are optional
+                print(f"Parquet support is not installed, writing {name} as CSV")
+        path = os.path.join(folder, f"{name}.csv")
+        table.to_csv(path)
+        paths.append(path)
+    if result.get('stats') is not None:
+        path = os.path.join(folder, 'stats.json')
+        with open(path, 'w') as fout:
+            json.dump(result['stats'], fout, indent=2)
+        paths.append(path)
+    return paths
+
+
+def render_figures(result:dict, formats:List[str]):
+    """
+    Renders the figures of the result in every format, returns the file
+    contents as {format: {name: bytes}}.
+    """
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from analyses import FEATURES
+
+    key = result.get('cache_key') if result_cache.enabled() else None
+    cache = ResultCache() if key else None
+    rendered = {}
+    for figure_format in formats:
+        figures = cache.get_figures(key, figure_format) if cache else None
+        if figures is not None:
+            rendered[figure_format] = figures
+    missing = [figure_format for figure_format in formats if figure_format not in rendered]
+    if missing:
+        with profiling.phase('export.render'):
+            figures = FEATURES[result['feature']].render(result)
+        for figure_format in missing:
+            rendered[figure_format] = {}
+            with profiling.phase(f'export.save_{figure_format}'):
+                for name, figure in figures.items():
+                    buffer = io.BytesIO()
+                    figure.savefig(buffer, format=figure_format)
+                    rendered[figure_format][name] = buffer.getvalue()
+            if cache:
+                cache.put_figures(key, figure_format, rendered[figure_format])
+        for figure in figures.values():
+            plt.close(figure)
+    return rendered
+
+
+def write_figures(result:dict, folder:str, formats:List[str]):
+    """
+    Renders the figures of the result and saves them in every format,
+    returns the written paths.
+    """
+    rendered = render_figures(result, formats)
+    paths = []
+    for figure_format in formats:
+        for name, contents in rendered[figure_format].items():
+            path = os.path.join(folder, f"{name}.{figure_format}")
+            with open(path, 'wb') as fout:
+                fout.write(contents)
+            paths.append(path)
+    return paths
+
+
+def _write_figures(args):
+    return write_figures(*args)
+
+
+def export(results:List[dict], output:str, formats:List[str]=None, table_format:str='csv', workers:int=1):
+    """
+    Writes the tables, statistics and figures of the results to the output
+    folder. Figures are rendered on `workers` processes.
+    Returns the written paths.
+    """
+    formats = formats or ['png']
+    invalid = [each for each in formats if each not in FIGURE_FORMATS] + \
+              ([table_format] if table_format not in TABLE_FORMATS else [])
+    if invalid:
+        raise ValueError(f"Invalid output formats {invalid}, expected any of {FIGURE_FORMATS + TABLE_FORMATS}")
+
+    paths = []
+    jobs = []
+    for result in results:
+        folder = os.path.join(output, result_name(result))
+        os.makedirs(folder, exist_ok=True)
+        with profiling.phase('export.write_tables'):
+            paths += write_tables(result, folder, table_format)
+        jobs.append((result, folder, formats))
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            for rendered in pool.map(_write_figures, jobs):
+                paths += rendered
+    else:
+        for job in jobs:
+            paths += write_figures(*job)
+    return paths
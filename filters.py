@@ -0,0 +1,95 @@
+"""
+Filter selecting the issues to load, from the --user, --label, --year and
+--state arguments.
+
+The predicates are checked on the raw JSON record of an issue, before the
+Issue is built, so the dates (except the created date, when filtering by
+year) and events of a rejected issue are never parsed. Issues read from a
+snapshot are already built and are filtered afterwards. All analyses see
+the same filtered issues.
+"""
+
+from datetime import datetime, timezone
+
+import config
+import profiling
+from model import Issue
+from timestamps import parse_timestamp
+
+
+class IssueFilter:
+
+    def __init__(self, user:str=None, label:str=None, year:int=None, state:str=None):
+        # Creator or assignee
+        self.user:str = user
+        # Full label name (kind/bug) or label category (kind)
+        self.label:str = label
+        self.year:int = year
+        self.state:str = state
+        # Created dates in [start, end)
+        self.start:datetime = datetime(year, 1, 1, tzinfo=timezone.utc) if year else None
+        self.end:datetime = datetime(year + 1, 1, 1, tzinfo=timezone.utc) if year else None
+
+    @classmethod
+    def from_config(cls):
+        """
+        Returns the filter of the config parameters, or None if there is
+        nothing to filter. 'all' and lists of years (batch mode) select
+        every year.
+        """
+        year = config.get_parameter('year')
+        year = int(year) if year is not None and str(year).isdigit() else None
+        issue_filter = cls(config.get_parameter('user'), config.get_parameter('label'), year, config.get_parameter('state'))
+        return issue_filter if str(issue_filter) else None
+
+    def __str__(self):
+        return ' '.join(f"{name}={value}" for name, value in
+                        [('user', self.user), ('label', self.label), ('year', self.year), ('state', self.state)]
+                        if value is not None)
+
+    def matches_record(self, jobj:dict):
+        """
+        Checks the JSON record of an issue, parsing its created date only.
+        """
+        if self.state is not None and jobj.get('state') != self.state:
+            return False
+        if self.user is not None and jobj.get('creator') != self.user and self.user not in jobj.get('assignees', []):
+            return False
+        if self.label is not None and not any(self.matches_label(*_split_label(label)) for label in jobj.get('labels', [])):
+            return False
+        if self.start is not None:
+            created = parse_timestamp(jobj.get('created_date'))
+            return created is not None and self.start <= created < self.end
+        return True
+
+    def matches(self, issue:Issue):
+        if self.state is not None and issue.state.value != self.state:
+            return False
+        if self.user is not None and issue.creator != self.user and self.user not in issue.assignees:
+            return False
+        if self.label is not None and not any(self.matches_label(label.category, label.full_label())
+                                              for label in issue.labels):
+            return False
+        if self.start is not None:
+            return issue.created_date is not None and self.start <= issue.created_date < self.end
+        return True
+
+    def matches_label(self, category:str, full_label:str):
+        return self.label in (category, full_label)
+
+    def report(self, materialized:int, skipped:int):
+        """
+        Prints how many issues were kept and how many records skipped.
+        """
+        print(f"Filter {self}: materialized {materialized} issues, skipped {skipped} records.")
+        profiling.count('materialized issues', materialized)
+        profiling.count('skipped records', skipped)
+
+
+def _split_label(label:str):
+    """
+    Returns the category and full name of a label string, as the Label
+    model splits it (see model.py).
+    """
+    parts = label.split('/')
+    return parts[0], label if len(parts) == 2 and parts[1] else parts[0]
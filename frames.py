@@ -0,0 +1,85 @@
+"""
+Builds typed, columnar tables from the loaded issues. The tables are built
+once by the DataLoader and shared by the analyses, so the per-issue and
+per-label Python work is only done once per process.
+
+All tables are pandas DataFrames. Rows of the label and event tables point
+to their issue through the 'issue' column, which is the row position of the
+issue in the issue table. Dates are stored as UTC datetime64 columns (int64
+underneath) with NaT for missing values.
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from model import Issue, State
+
+STATE_DTYPE = pd.CategoricalDtype([state.value for state in State])
+
+
+def to_datetimes(values:list):
+    """
+    Converts dates (datetimes, dates or None) to a Series of UTC datetimes.
+    """
+    # Microseconds, like datetime, even when every value is missing
+    return pd.to_datetime(pd.Series(values, dtype=object), utc=True).dt.as_unit('us')
+
+
+def build_issue_frame(issues:List[Issue]):
+    """
+    One row per issue with its number, state, creator, dates and the
+    summary of its events.
+    """
+    return pd.DataFrame({
+        'number': np.fromiter((issue.number for issue in issues), dtype=np.int64, count=len(issues)),
+        'state': pd.Categorical([issue.state.value for issue in issues], dtype=STATE_DTYPE),
+        'creator': pd.Categorical([issue.creator for issue in issues]),
+        'created_date': to_datetimes([issue.created_date for issue in issues]),
+        'updated_date': to_datetimes([issue.updated_date for issue in issues]),
+        'closed_date': to_datetimes([issue.closed_date for issue in issues]),
+        'latest_closed_date': to_datetimes([issue.latest_closed_date for issue in issues]),
+        'latest_reopened_date': to_datetimes([issue.latest_reopened_date for issue in issues]),
+        'max_event_date': to_datetimes([issue.max_event_date for issue in issues]),
+    })
+
+
+def build_label_frame(issues:List[Issue]):
+    """
+    One row per label of each issue (the labels exploded), in the order of
+    the issues and of the labels within each issue.
+    """
+    issue_ids, categories, sublabels = [], [], []
+    for i, issue in enumerate(issues):
+        for label in issue.labels:
+            issue_ids.append(i)
+            categories.append(label.category)
+            sublabels.append(label.sublabel)
+    return pd.DataFrame({
+        'issue': np.array(issue_ids, dtype=np.int64),
+        'category': pd.Categorical(categories),
+        'sublabel': pd.Categorical(sublabels),
+    })
+
+
+def build_event_frame(issues:List[Issue]):
+    """
+    One row per event of each issue, in the order of the issues and of the
+    events within each issue.
+    """
+    issue_ids, event_types, authors, event_dates, labels = [], [], [], [], []
+    for i, issue in enumerate(issues):
+        for event in issue.events:
+            issue_ids.append(i)
+            event_types.append(event.event_type)
+            authors.append(event.author)
+            event_dates.append(event.event_date)
+            labels.append(event.label)
+    return pd.DataFrame({
+        'issue': np.array(issue_ids, dtype=np.int64),
+        'event_type': pd.Categorical(event_types),
+        'author': pd.Categorical(authors),
+        'event_date': to_datetimes(event_dates),
+        'label': pd.Categorical(labels),
+    })
@@ -0,0 +1,171 @@
+"""
+Inverted indexes over the issue and label tables (see frames.py), built once
+by the DataLoader so the analyses can select the issues matching a query
+without scanning every issue or label.
+
+Every index maps a value to a sorted int64 array of row positions: issue
+positions for the category, sublabel, year, month and state indexes, and
+label table rows for the category rows index. Queries intersect the sorted
+arrays, smallest first.
+
+The interval index answers how many issues of a label were open at the
+start of a day from the daily changes of the open issues, built from the aggregates so it
+is available for several data files too.
+"""
+
+from datetime import date
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from workload import sample_dates, to_timestamp
+
+EMPTY = np.empty(0, dtype=np.int64)
+EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def _group(values:pd.Series):
+    """
+    Maps each distinct value to the sorted index labels (positions in the
+    issue or label table) it appears at.
+    """
+    labels = values.index.to_numpy(dtype=np.int64)
+    return {key: labels[positions]
+            for key, positions in values.groupby(values.to_numpy(), sort=False).indices.items()}
+
+
+def _intersect(arrays):
+    arrays = sorted(arrays, key=len)
+    result = arrays[0]
+    for array in arrays[1:]:
+        if not len(result):
+            break
+        result = np.intersect1d(result, array, assume_unique=True)
+    return result
+
+
+class IssueIndex:
+
+    def __init__(self, issues:pd.DataFrame, labels:pd.DataFrame):
+        self.issue_count:int = len(issues)
+        # Issue position of each label row, sorted since labels follow issue order
+        self.label_issues:np.ndarray = labels['issue'].to_numpy()
+
+        self.states:Dict[str, np.ndarray] = _group(issues['state'].astype(object))
+        created = issues['created_date'].dropna()
+        self.years:Dict[int, np.ndarray] = _group(created.dt.year)
+        # Months are keyed by year * 100 + month, e.g. 202403
+        self.months:Dict[int, np.ndarray] = _group(created.dt.year * 100 + created.dt.month)
+
+        self.category_rows:Dict[str, np.ndarray] = _group(labels['category'].astype(object))
+        self.categories:Dict[str, np.ndarray] = {}
+        self.sublabels:Dict[str, Dict[str, np.ndarray]] = {}
+        sublabels = labels['sublabel'].astype(object)
+        for category, rows in self.category_rows.items():
+            self.categories[category] = np.unique(self.label_issues[rows])
+            self.sublabels[category] = {sublabel: np.unique(self.label_issues[sublabel_rows])
+                                        for sublabel, sublabel_rows in _group(sublabels.iloc[rows]).items()}
+
+    def issues(self, category:str=None, sublabel:str=None, year:int=None, month:int=None, state:str=None):
+        """
+        Returns the sorted positions of the issues with a label of the category
+        (and sublabel), created in the year (and month) and in the state.
+        Parameters left as None don't filter.
+        """
+        arrays = []
+        if category is not None:
+            if sublabel is not None:
+                arrays.append(self.sublabels.get(category, {}).get(sublabel, EMPTY))
+            else:
+                arrays.append(self.categories.get(category, EMPTY))
+        if year is not None:
+            if month is not None:
+                arrays.append(self.months.get(int(year) * 100 + int(month), EMPTY))
+            else:
+                arrays.append(self.years.get(int(year), EMPTY))
+        if state is not None:
+            arrays.append(self.states.get(str(state), EMPTY))
+        if not arrays:
+            return np.arange(self.issue_count, dtype=np.int64)
+        return _intersect(arrays)
+
+    def label_rows(self, category:str, issues:np.ndarray=None):
+        """
+        Returns the rows of the label table with the category, in table order.
+        If `issues` (sorted issue positions) is given, only the rows of those
+        issues are returned, found by binary search.
+        """
+        rows = self.category_rows.get(category, EMPTY)
+        if issues is None:
+            return rows
+        row_issues = self.label_issues[rows]
+        starts = np.searchsorted(row_issues, issues, side='left')
+        lengths = np.searchsorted(row_issues, issues, side='right') - starts
+        # Concatenate the ranges [start, start + length) of every issue
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return rows[offsets]
+
+
+class IntervalIndex:
+    """
+    Issues of each label open at the start (00:00 UTC) of each day (see
+    Issue.get_open_intervals), as the sorted days their open count changed
+    with the cumulative counts. The issues of a label open at the start of a
+    day are the count of the last change up to that day: one binary search,
+    so a point query takes O(log d) for d days with changes and a range of
+    k dates O(k log d).
+    """
+
+    def __init__(self, changes:dict):
+        """
+        `changes` counts the changes of the open issues by (label, day), +1
+        on the first day starting in a period and -1 on the day after its
+        last day (see Aggregates.open_days).
+        """
+        days = {}
+        for (label, day), change in changes.items():
+            days.setdefault(label, []).append((day.toordinal() - EPOCH_DAY, change))
+        # Labels in order of first appearance
+        self.labels:list = list(days)
+        self.days:Dict[str, np.ndarray] = {}
+        self.counts:Dict[str, np.ndarray] = {}
+        for label, rows in days.items():
+            rows = np.array(sorted(rows), dtype=np.int64)
+            self.days[label] = rows[:, 0]
+            self.counts[label] = np.concatenate([[0], np.cumsum(rows[:, 1])])
+
+    def open_at(self, label:str, time) -> int:
+        """
+        Returns how many issues with the label were open at the start of the
+        day of the time.
+        """
+        return int(self._count(label, _days(pd.DatetimeIndex([to_timestamp(time)])))[0])
+
+    def open_counts(self, dates:pd.DatetimeIndex, labels:list=None) -> pd.DataFrame:
+        """
+        Returns how many issues of each label (all of them by default) were
+        open at the start of the day of each date, one column per label.
+        """
+        days = _days(dates)
+        return pd.DataFrame({label: self._count(label, days) for label in (self.labels if labels is None else labels)},
+                            index=dates)
+
+    def open_range(self, start, end, resolution:str='day', labels:list=None) -> pd.DataFrame:
+        """
+        Returns the open counts of open_counts() from start to end, every
+        day or at the start of every week or month (see workload.py).
+        """
+        return self.open_counts(sample_dates(to_timestamp(start), to_timestamp(end), resolution=resolution), labels)
+
+    def _count(self, label:str, days:np.ndarray) -> np.ndarray:
+        if label not in self.days:
+            return np.zeros(len(days), dtype=np.int64)
+        return self.counts[label][np.searchsorted(self.days[label], days, side='right')]
+
+
+def _days(dates:pd.DatetimeIndex) -> np.ndarray:
+    """
+    Returns the UTC days of the dates as days since the epoch.
+    """
+    return dates.as_unit('us').asi8 // (24 * 60 * 60 * 10**6)
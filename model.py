@@ -3,10 +3,12 @@ Implements a runtime data model that can be used to access
 the properties contained in the issues JSON.
 """
 
+import sys
 from typing import List, Dict, Set, Tuple
 from enum import Enum
 from datetime import datetime
-from dateutil import parser
+
+from timestamps import parse_timestamp
 
 
 class State(str, Enum):
@@ -17,8 +19,17 @@ class State(str, Enum):
     closed = 'closed'
 
 
+def _intern(value):
+    """
+    Interns strings that repeat across issues (authors, event types, labels)
+    so each distinct value is stored once.
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
 class Event:
-    
+    __slots__ = ('event_type', 'author', 'event_date', 'label', 'comment')
+
     def __init__(self, jobj:any):
         self.event_type:str = None
         self.author:str = None
@@ -30,31 +41,48 @@ class Event:
             self.from_json(jobj)
     
     def from_json(self, jobj:any):
-        self.event_type = jobj.get('event_type')
-        self.author = jobj.get('author')
-        try:
-            self.event_date = parser.parse(jobj.get('event_date'))
-        except:
-            pass
-        self.label = jobj.get('label')
+        self.event_type = _intern(jobj.get('event_type'))
+        self.author = _intern(jobj.get('author'))
+        self.event_date = parse_timestamp(jobj.get('event_date'))
+        self.label = _intern(jobj.get('label'))
         self.comment = jobj.get('comment')
 
 
 class Label:
+    __slots__ = ('category', 'sublabel')
+
     def __init__(self, label:str):
         split_label = label.split('/')
-        self.category:str = split_label[0]
+        self.category:str = _intern(split_label[0])
         if len(split_label) == 2:
-            self.sublabel:str = split_label[1] 
+            self.sublabel:str = _intern(split_label[1])
         else:
-            self.sublabel:str = ""       
+            self.sublabel:str = ""
+
+    @classmethod
+    def from_string(cls, label:str):
+        """
+        Returns the shared Label for the label string. Labels are never
+        modified, so issues with the same label share one instance.
+        """
+        shared = _LABELS.get(label)
+        if shared is None:
+            shared = _LABELS[label] = cls(label)
+        return shared
 
     def full_label(self):
         return self.category + "/" + self.sublabel if getattr(self,"sublabel",None) else self.category
-        
+
+# Shared Label instances by label string
+_LABELS:Dict[str, Label] = {}
+
 class Issue:
-    
-    def __init__(self, jobj:any=None):
+    __slots__ = ('url', 'creator', 'labels', 'state', 'assignees', 'title', 'text', 'number',
+                 'created_date', 'updated_date', 'timeline_url', 'closed_date',
+                 'latest_closed_date', 'latest_reopened_date', 'max_event_date',
+                 '_events', '_raw_events')
+
+    def __init__(self, jobj:any=None, dates:Tuple[datetime, ...]=None):
         self.url:str = None
         self.creator:str = None
         self.labels:List[Label] = []
@@ -68,40 +96,134 @@ class Issue:
         self.timeline_url:str = None
         self.events:List[Event] = []
         self.closed_date:datetime = None
-        
+        # Summary of the events, computed when the issue is loaded
+        self.latest_closed_date:datetime = None
+        self.latest_reopened_date:datetime = None
+        self.max_event_date:datetime = None
+
         if jobj is not None:
-            self.from_json(jobj)
+            self.from_json(jobj, dates)
+
+    @property
+    def events(self) -> List[Event]:
+        """
+        The events of the issue. They are kept as the raw JSON records until
+        first accessed, since most analyses only need the event summary.
+        """
+        if self._events is None:
+            self._events = [Event(jevent) for jevent in self._raw_events]
+            self._raw_events = None
+        return self._events
+
+    @events.setter
+    def events(self, events:List[Event]):
+        self._events = events
+        self._raw_events = None
+
+    @property
+    def event_count(self) -> int:
+        """
+        The number of events, without building them.
+        """
+        return len(self._events if self._events is not None else self._raw_events)
+
+    def summarize_events(self):
+        """
+        Computes the latest closed date, latest reopened date and latest date
+        of any event in a single pass over the events.
+        """
+        if self._events is None:
+            summary = summarize_event_records(self._raw_events)
+        else:
+            summary = _summarize((event.event_type, event.event_date) for event in self._events)
+        self.latest_closed_date, self.latest_reopened_date, self.max_event_date = summary
 
     def set_closed_date(self):
         if self.state == "open":
             return False
-        # closed_events = 
-        latest_closed_date = max([event.event_date for event in self.events if event.event_type=="closed" and event.event_date],default=None)
-        latest_reopen_date = max([event.event_date for event in self.events if event.event_type=="reopened" and event.event_date],default=None)
+        latest_closed_date = self.latest_closed_date
+        latest_reopen_date = self.latest_reopened_date
         if  latest_reopen_date and latest_closed_date and latest_reopen_date > latest_closed_date:
             return False
         self.closed_date = latest_closed_date
 
-    def from_json(self, jobj:any):
+    def get_open_intervals(self) -> Tuple[Tuple[datetime, datetime], ...]:
+        """
+        Returns the (opened, closed) periods the issue was open, from its
+        creation and its closed and reopened events. The last period of an
+        open issue has no closed date. A closed issue whose last event
+        reopened it is taken as closed at its updated date, an open issue
+        whose last event closed it as reopened at its updated date.
+        """
+        if self.created_date is None:
+            return ()
+        changes = ([(event.event_type, event.event_date) for event in self._events] if self._events is not None else
+                   [(jevent.get('event_type'), jevent.get('event_date')) for jevent in self._raw_events])
+        changes = [(event_type, parse_timestamp(date) if isinstance(date, str) else date)
+                   for event_type, date in changes if event_type in ("closed", "reopened")]
+        intervals = []
+        opened = self.created_date
+        for event_type, date in sorted((change for change in changes if change[1] is not None), key=lambda change: change[1]):
+            if event_type == "closed" and opened is not None:
+                intervals.append((opened, max(opened, date)))
+                opened = None
+            elif event_type == "reopened" and opened is None:
+                opened = date
+        if self.state == State.closed and opened is not None:
+            intervals.append((opened, max(opened, self.updated_date or opened)))
+        elif self.state == State.open:
+            if opened is None:
+                opened = max(intervals[-1][1], self.updated_date or intervals[-1][1])
+            intervals.append((opened, None))
+        return tuple(intervals)
+
+    def from_json(self, jobj:any, dates:Tuple[datetime, ...]=None):
+        """
+        Loads the issue from its JSON record. `dates` can hold the already
+        parsed (created, updated, latest closed, latest reopened, max event)
+        dates, e.g. from a parallel load, to skip parsing them here.
+        """
         self.url = jobj.get('url')
-        self.creator = jobj.get('creator')
-        self.labels = [Label(label) for label in jobj.get('labels',[])]
+        self.creator = _intern(jobj.get('creator'))
+        self.labels = [Label.from_string(label) for label in jobj.get('labels',[])]
         self.state = State[jobj.get('state')]
-        self.assignees = jobj.get('assignees',[])
+        self.assignees = [_intern(assignee) for assignee in jobj.get('assignees',[])]
         self.title = jobj.get('title')
         self.text = jobj.get('text')
         try:
             self.number = int(jobj.get('number','-1'))
         except:
             pass
-        try:
-            self.created_date = parser.parse(jobj.get('created_date'))
-        except:
-            pass
-        try:
-            self.updated_date = parser.parse(jobj.get('updated_date'))
-        except:
-            pass
         self.timeline_url = jobj.get('timeline_url')
-        self.events = [Event(jevent) for jevent in jobj.get('events',[])]
-        self.set_closed_date()
\ No newline at end of file
+        self._events = None
+        self._raw_events = jobj.get('events',[])
+        if dates is None:
+            self.created_date = parse_timestamp(jobj.get('created_date'))
+            self.updated_date = parse_timestamp(jobj.get('updated_date'))
+            self.summarize_events()
+        else:
+            (self.created_date, self.updated_date,
+             self.latest_closed_date, self.latest_reopened_date, self.max_event_date) = dates
+        self.set_closed_date()
+
+
+def summarize_event_records(jevents:List[dict]):
+    """
+    Returns the latest closed date, latest reopened date and latest date of
+    any event from the raw JSON event records.
+    """
+    return _summarize((jevent.get('event_type'), parse_timestamp(jevent.get('event_date'))) for jevent in jevents)
+
+
+def _summarize(events):
+    latest_closed_date = latest_reopened_date = max_event_date = None
+    for event_type, event_date in events:
+        if event_date is None:
+            continue
+        if max_event_date is None or event_date > max_event_date:
+            max_event_date = event_date
+        if event_type == "closed" and (latest_closed_date is None or event_date > latest_closed_date):
+            latest_closed_date = event_date
+        elif event_type == "reopened" and (latest_reopened_date is None or event_date > latest_reopened_date):
+            latest_reopened_date = event_date
+    return latest_closed_date, latest_reopened_date, max_event_date
\ No newline at end of file
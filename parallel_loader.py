@@ -0,0 +1,72 @@
+"""
+Builds the issues using a pool of worker processes.
+
+The decoded JSON records are shared with forked workers (copy-on-write), so
+only the bounds of each chunk are sent to them. Each worker parses the dates
+and summarizes the events of its chunk and sends them back as an int64 array
+of epoch microseconds, which is cheap to pickle. The main process then builds
+the Issue objects from the records with the parsed dates, without parsing.
+
+Only the date parsing runs in parallel, building the Issue objects stays
+serial: an Issue keeps its record's labels, text and raw events, so sending
+built issues back would pickle most of the record, and unpickling 50k
+issues in the main process takes longer (0.65s) than building them from
+the records (0.45s).
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+
+from model import Issue, summarize_event_records
+from timestamps import from_epoch_us, parse_timestamp, to_epoch_us
+
+# Chunks handed out per worker, more chunks balance uneven issue sizes
+CHUNKS_PER_WORKER = 4
+
+# Decoded issue records inherited by the forked workers
+_JOBJS:List[dict] = None
+
+
+def can_fork():
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def load(jobjs:List[dict], workers:int):
+    """
+    Builds the issues from the decoded JSON records on `workers` processes.
+    Falls back to building them in this process for a single worker or
+    when processes can't be forked.
+    """
+    global _JOBJS
+    if workers <= 1 or len(jobjs) < workers or not can_fork():
+        return [Issue(jobj) for jobj in jobjs]
+
+    size = -(-len(jobjs) // (workers * CHUNKS_PER_WORKER))
+    bounds = [(start, min(start + size, len(jobjs))) for start in range(0, len(jobjs), size)]
+    issues = []
+    _JOBJS = jobjs
+    try:
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            for (start, stop), dates in zip(bounds, pool.map(_parse_dates, bounds)):
+                for jobj, row in zip(jobjs[start:stop], dates.tolist()):
+                    issues.append(Issue(jobj, tuple(map(from_epoch_us, row))))
+    finally:
+        _JOBJS = None
+    return issues
+
+
+def _parse_dates(bounds):
+    """
+    Worker: returns the created, updated, latest closed, latest reopened and
+    max event dates of the issues in the chunk as epoch microseconds.
+    """
+    start, stop = bounds
+    dates = np.empty((stop - start, 5), dtype=np.int64)
+    for row, jobj in enumerate(_JOBJS[start:stop]):
+        dates[row] = (to_epoch_us(parse_timestamp(jobj.get('created_date'))),
+                      to_epoch_us(parse_timestamp(jobj.get('updated_date'))),
+                      *(to_epoch_us(date) for date in summarize_event_records(jobj.get('events',[]))))
+    return dates
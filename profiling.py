@@ -0,0 +1,169 @@
+"""
+Records the wall time, CPU time and memory of the named phases of a run
+(--profile), plus counts of the loaded objects.
+
+Phases are marked with `with profiling.phase('name'):` and can be nested.
+When profiling is disabled, `phase()` returns a shared no-op context
+manager, so the marks cost next to nothing. The recorded phases are
+printed as a summary and written as a trace-event JSON file, which can be
+opened in chrome://tracing or https://ui.perfetto.dev.
+
+Memory is taken from the operating system and from tracemalloc: the
+resident set size (RSS) before and after each phase, and the peak of the
+memory allocated during the phase over what was allocated when it started,
+traced by tracemalloc (numpy arrays included). The peak RSS of the whole
+process is reported once, separately. RSS is only available on Linux and
+the peak RSS on Unix. Tracing the allocations slows the run down, so the
+times of a profiled run are longer than those of a normal one.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+_ENABLED:bool = False
+# Completed phases as (name, depth, start, wall, cpu, rss before, rss after, peak allocated)
+_PHASES:list = []
+# Phases entered and not exited yet, outermost first
+_OPEN:list = []
+_COUNTS:Counter = Counter()
+_DEPTH:int = 0
+_START:float = None
+_DISABLED = contextlib.nullcontext()
+
+
+def enable():
+    global _ENABLED, _START
+    _ENABLED = True
+    _START = time.perf_counter()
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def enabled():
+    return _ENABLED
+
+
+def phase(name:str):
+    """
+    Returns a context manager recording the phase when profiling is enabled.
+    """
+    return _Phase(name) if _ENABLED else _DISABLED
+
+
+def count(name:str, value:int):
+    """
+    Adds to a count of objects, e.g. the loaded issues.
+    """
+    if _ENABLED:
+        _COUNTS[name] += value
+
+
+class _Phase:
+
+    def __init__(self, name:str):
+        self.name = name
+
+    def __enter__(self):
+        global _DEPTH
+        self.depth = _DEPTH
+        _DEPTH += 1
+        self.rss = _rss()
+        # The traced peak is reset for this phase, so the enclosing phases
+        # keep the peak reached so far themselves
+        self.allocated, peak = tracemalloc.get_traced_memory()
+        for parent in _OPEN:
+            parent.peak = max(parent.peak, peak)
+        self.peak = self.allocated
+        tracemalloc.reset_peak()
+        _OPEN.append(self)
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _DEPTH
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu
+        _DEPTH -= 1
+        _OPEN.remove(self)
+        peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        _PHASES.append((self.name, self.depth, self.start - _START, wall, cpu, self.rss, _rss(), peak - self.allocated))
+        return False
+
+
+def _rss():
+    """
+    Returns the current resident set size in bytes, or None.
+    """
+    try:
+        with open('/proc/self/statm', 'r') as fin:
+            return int(fin.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss():
+    """
+    Returns the peak resident set size of the process in bytes, or None.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _megabytes(value):
+    return f"{value / 2**20:.1f}" if value is not None else '-'
+
+
+def summary():
+    """
+    Returns the recorded phases, totaled by name in the order they started,
+    the peak RSS of the process and the counts as a table.
+    """
+    totals = {}
+    for name, depth, start, wall, cpu, rss_before, rss_after, peak in sorted(_PHASES, key=lambda each: each[2]):
+        total = totals.setdefault(name, {'depth': depth, 'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'rss': None, 'peak': None})
+        total['calls'] += 1
+        total['wall'] += wall
+        total['cpu'] += cpu
+        if rss_before is not None and rss_after is not None:
+            total['rss'] = (total['rss'] or 0) + rss_after - rss_before
+        if peak is not None:
+            total['peak'] = max(total['peak'] or 0, peak)
+
+    lines = [f"{'phase':<40} {'calls':>5} {'wall s':>8} {'cpu s':>8} {'+rss MB':>8} {'peak MB':>8}"]
+    for name, total in totals.items():
+        label = '  ' * total['depth'] + name
+        lines.append(f"{label:<40} {total['calls']:>5} {total['wall']:>8.3f} {total['cpu']:>8.3f} "
+                     f"{_megabytes(total['rss']):>8} {_megabytes(total['peak']):>8}")
+    lines += ['', f"{'process peak rss MB':<40} {_megabytes(_peak_rss()):>10}"]
+    if _COUNTS:
+        lines.append('')
+        lines += [f"{name:<40} {value:>10,}" for name, value in _COUNTS.items()]
+    return '\n'.join(lines)
+
+
+def write_trace(path:str):
+    """
+    Writes the recorded phases as complete events of the trace-event format.
+    """
+    pid = os.getpid()
+    events = [{'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': 0,
+               'ts': start * 1e6, 'dur': wall * 1e6,
+               'args': {'cpu_ms': cpu * 1e3, 'rss_before': rss_before, 'rss_after': rss_after, 'peak_allocated': peak}}
+              for name, depth, start, wall, cpu, rss_before, rss_after, peak in _PHASES]
+    with open(path, 'w') as fout:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                   'otherData': {'counts': dict(_COUNTS), 'peak_rss': _peak_rss()}}, fout)
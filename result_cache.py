@@ -0,0 +1,205 @@
+"""
+Disk cache of the computed results of the analyses.
+
+Results are stored under a key derived from the content hash of the data
+file, the analysis and its version, and the parameters of the analysis, so
+a cached result is reused only for exactly the same inputs. Rendered figures
+can be stored next to the result. The cache is bounded in size, the least
+recently used entries are evicted first, and it keeps hit/miss counters.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+import config
+import profiling
+
+DEFAULT_PATH = '.result_cache'
+DEFAULT_SIZE_MB = 256
+STATS_FILE = 'stats.json'
+
+
+class ResultCache:
+
+    def __init__(self, path:str=None, max_bytes:int=None):
+        self.path:str = path or config.get_parameter('ENPM611_PROJECT_RESULT_CACHE_PATH', DEFAULT_PATH)
+        if max_bytes is None:
+            max_bytes = int(config.get_parameter('ENPM611_PROJECT_RESULT_CACHE_SIZE_MB', DEFAULT_SIZE_MB)) << 20
+        self.max_bytes:int = max_bytes
+
+    @staticmethod
+    def make_key(fingerprint:str, analysis):
+        """
+        Returns the cache key of the analysis run on the dataset with the
+        given content hash.
+        """
+        key = {
+            'dataset': fingerprint,
+            'analysis': type(analysis).__name__,
+            'version': analysis.VERSION,
+            'params': analysis.params(),
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get_result(self, key:str):
+        """
+        Returns the cached result for the key, or None on a miss.
+        """
+        result = self._read(self._result_path(key))
+        self._count('hits' if result is not None else 'misses')
+        return result
+
+    def put_result(self, key:str, result:dict):
+        self._write(self._result_path(key), result)
+
+    def get_figures(self, key:str, figure_format:str):
+        """
+        Returns the cached rendered figures ({name: file contents}) of the
+        result in the format, or None.
+        """
+        return self._read(self._figures_path(key, figure_format))
+
+    def put_figures(self, key:str, figure_format:str, figures:dict):
+        self._write(self._figures_path(key, figure_format), figures)
+
+    def get_stats(self):
+        """
+        Returns the hit/miss counters and the number and size of the entries.
+        """
+        stats = self._read_stats()
+        entries = self._entries()
+        stats['entries'] = len(entries)
+        stats['bytes'] = sum(size for _, size, _ in entries)
+        return stats
+
+    def purge(self):
+        """
+        Removes every entry and resets the counters.
+        """
+        for path, _, _ in self._entries():
+            os.remove(path)
+        stats_path = os.path.join(self.path, STATS_FILE)
+        if os.path.exists(stats_path):
+            os.remove(stats_path)
+
+    def _result_path(self, key:str):
+        return os.path.join(self.path, f"{key}.result.pickle")
+
+    def _figures_path(self, key:str, figure_format:str):
+        return os.path.join(self.path, f"{key}.figures.{figure_format}.pickle")
+
+    def _read(self, path:str):
+        try:
+            with open(path, 'rb') as fin:
+                value = pickle.load(fin)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        # The modification time tracks the last use for the LRU eviction
+        os.utime(path)
+        return value
+
+    def _write(self, path:str, value):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as fout:
+            pickle.dump(value, fout, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _entries(self):
+        """
+        Returns (path, size, last use) of every entry.
+        """
+        entries = []
+        if not os.path.isdir(self.path):
+            return entries
+        for name in os.listdir(self.path):
+            if name.endswith('.pickle'):
+                path = os.path.join(self.path, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime_ns))
+        return entries
+
+    def _evict(self):
+        """
+        Removes the least recently used entries until the cache fits its size.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        while entries and total > self.max_bytes:
+            path, size, _ = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def _read_stats(self):
+        try:
+            with open(os.path.join(self.path, STATS_FILE), 'r') as fin:
+                return json.load(fin)
+        except (OSError, ValueError):
+            return {'hits': 0, 'misses': 0}
+
+    def _count(self, counter:str):
+        stats = self._read_stats()
+        stats[counter] = stats.get(counter, 0) + 1
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            stats_path = os.path.join(self.path, STATS_FILE)
+            with open(f"{stats_path}.{os.getpid()}.tmp", 'w') as fout:
+                json.dump(stats, fout)
+            os.replace(f"{stats_path}.{os.getpid()}.tmp", stats_path)
+        except OSError:
+            pass
+
+
+def enabled():
+    return not config.get_parameter('no_result_cache')
+
+
+def lookup(analysis, cache:ResultCache=None):
+    """
+    Returns the cached result of the analysis, or None on a miss or when
+    the result cache is disabled with --no-result-cache.
+    """
+    if not enabled():
+        return None
+    cache = cache or ResultCache()
+    return cache.get_result(ResultCache.make_key(analysis.loader.get_fingerprint(), analysis))
+
+
+def store(analysis, result:dict, cache:ResultCache=None):
+    """
+    Stores the result of the analysis. The cache key is added to the result
+    as 'cache_key' so its rendered figures can be cached too.
+    """
+    if not enabled():
+        return
+    cache = cache or ResultCache()
+    result['cache_key'] = ResultCache.make_key(analysis.loader.get_fingerprint(), analysis)
+    try:
+        cache.put_result(result['cache_key'], result)
+    except OSError as e:
+        print(f"Could not write result to {cache.path}: {e}")
+
+
+def compute(analysis, cache:ResultCache=None):
+    """
+    Returns the result of the analysis from the cache, computing and storing
+    it on a miss.
+    """
+    name = type(analysis).__name__
+    with profiling.phase(f"{name}.cache_lookup"):
+        result = lookup(analysis, cache)
+    if result is None:
+        with profiling.phase(f"{name}.compute"):
+            result = analysis.compute()
+        with profiling.phase(f"{name}.cache_store"):
+            store(analysis, result, cache)
+    return result
@@ -8,7 +8,11 @@ the command line to run the analyses.
 import argparse
 
 import config
-from analyses import Analysis1, Analysis2, Analysis3
+import profiling
+import result_cache
+import timestamps
+from analyses import FEATURES
+from data_loader import DataLoader
 
 
 def parse_args():
@@ -24,21 +28,46 @@ def parse_args():
     ap = argparse.ArgumentParser("run.py")
     
     # Required parameter specifying what analysis to run
-    ap.add_argument('--feature', '-f', type=int, required=True,
-                    help='Which of the three features to run')
+    ap.add_argument('--feature', '-f', type=int, nargs='+', required=False,
+                    help='Which of the three features to run (several in batch mode)')
+
+    # Optional parameters for running several analyses in one process
+    ap.add_argument('--batch', '-b', action='store_true',
+                    help='Run every combination of the given features, categories and years. '
+                         'Categories and years are comma separated lists or "all"')
+    ap.add_argument('--workers', '-w', type=int, required=False,
+                    help='Number of worker processes running the analyses in batch mode and rendering exported figures (default: 1)')
+
+    # Optional parameters for writing the results to a folder instead of showing them
+    ap.add_argument('--output', type=str, required=False,
+                    help='Folder to write the figures, tables and statistics to instead of showing them')
+    ap.add_argument('--format', type=str, required=False,
+                    help='Comma separated figure formats written to --output: png, svg (default: png)')
+    ap.add_argument('--table-format', type=str, required=False, choices=['csv', 'parquet'],
+                    help='Format of the tables written to --output (default: csv)')
     
     # Optional parameter for analyses focusing on a specific user (i.e., contributor)
     ap.add_argument('--user', '-u', type=str, required=False,
-                    help='Optional parameter for analyses focusing on a specific user')
+                    help='Optional parameter for analyses focusing on the issues a specific user created or is assigned to')
     
     # Optional parameter for analyses focusing on a specific label
     ap.add_argument('--label', '-l', type=str, required=False,
-                    help='Optional parameter for analyses focusing on a specific label')
+                    help='Optional parameter for analyses focusing on the issues with a specific label (kind/bug) '
+                         'or label category (kind)')
 
     # Optional parameter for analyses focusing on issue based on years
     ap.add_argument('--year', '-y', type=str, required=False,
-                    help='Optional parameter for analyses focusing on a specific year or get all data using "all"')
+                    help='Optional parameter for analyses focusing on the issues created in a specific year or get all data using "all"')
+
+    # Optional parameter for analyses focusing on open or closed issues
+    ap.add_argument('--state', type=str, required=False, choices=['open', 'closed'],
+                    help='Optional parameter for analyses focusing on the open or the closed issues')
     
+    # Optional parameter for analyses focusing on one repository when several data files are loaded
+    ap.add_argument('--repository', type=str, required=False,
+                    help='Optional parameter for analyses focusing on one repository (owner/name) of the data files, '
+                         'all of them combined by default')
+
     # Optional parameter for analyses focusing on a specific category
     ap.add_argument('--category', '-c', type=str, required=False,
                     help='Optional parameter for analyses focusing on a specific category of label')
@@ -46,7 +75,57 @@ def parse_args():
     # Optional parameter for analyses grouping labels with a percentage cutout
     ap.add_argument('--other-cutout', '-o', type=int, required=False,
                     help='Percentage cutout for legend aggrupation of label per category in figure')
-    
+
+    # Optional flag estimating the statistics of the open age and closed duration analysis in bounded memory
+    ap.add_argument('--approximate', action='store_true',
+                    help='Estimate the medians and percentiles of the open age and closed duration analysis '
+                         'with quantile sketches in one streaming pass')
+
+    # Optional parameters for the time axis of the open issues analysis
+    ap.add_argument('--resolution', '-r', type=str, required=False, choices=['day', 'week', 'month'],
+                    help='Resolution of the historical open issues figure (default: day)')
+    ap.add_argument('--start', type=str, required=False,
+                    help='First date (YYYY-MM-DD) shown in the historical open issues figure')
+    ap.add_argument('--end', type=str, required=False,
+                    help='Last date (YYYY-MM-DD) shown in the historical open issues figure')
+
+    # Optional flags controlling the cache of computed results
+    ap.add_argument('--no-result-cache', action='store_true',
+                    help='Compute the results without reading or writing the result cache')
+    ap.add_argument('--result-cache-stats', action='store_true',
+                    help='Print the hit/miss counters and size of the result cache and exit')
+    ap.add_argument('--purge-result-cache', action='store_true',
+                    help='Remove every entry of the result cache and exit')
+
+    # Optional parameters for applying daily deltas of new or changed issues to the dataset
+    ap.add_argument('--ingest', type=str, nargs='+', required=False,
+                    help='Delta files (JSON arrays of new or changed issues, matched by number) to apply to the dataset and its snapshot')
+    ap.add_argument('--check-consistency', action='store_true',
+                    help='Compare the incrementally updated aggregates with a full rebuild from the issues')
+
+    # Optional parameter writing the dataset as memory-mapped columnar arrays
+    ap.add_argument('--export-columnar', type=str, required=False,
+                    help='Folder to write the dataset to as columnar arrays, which can then be used as the data path')
+
+    # Optional parameters for serving the analyses over HTTP from a dataset kept in memory
+    ap.add_argument('--serve', action='store_true',
+                    help='Load the dataset once and serve the analyses on a local HTTP endpoint')
+    ap.add_argument('--host', type=str, required=False,
+                    help='Address the server listens on (default: 127.0.0.1)')
+    ap.add_argument('--port', type=int, required=False,
+                    help='Port the server listens on (default: 8611)')
+
+    # Optional parameter recording where the time and memory of the run go
+    ap.add_argument('--profile', type=str, nargs='?', const='profile_trace.json', required=False,
+                    help='Print the time and memory of each phase of the run and write them as a trace-event file '
+                         '(default: profile_trace.json) that can be opened in chrome://tracing or Perfetto')
+
+    # Optional flags controlling the snapshot of parsed issues stored next to the data file
+    ap.add_argument('--rebuild-cache', action='store_true',
+                    help='Reparse the data file and rewrite the issue snapshot')
+    ap.add_argument('--no-cache', action='store_true',
+                    help='Parse the data file without reading or writing the issue snapshot')
+
 
     
     return ap.parse_args()
@@ -58,12 +137,64 @@ args = parse_args()
 # Add arguments to config so that they can be accessed in other parts of the application
 config.overwrite_from_args(args)
     
+formats = args.format.split(',') if args.format else None
+
+if args.profile:
+    profiling.enable()
+
+# Apply the deltas before running any analysis on the dataset
+if args.ingest:
+    loader = DataLoader()
+    for delta_path in args.ingest:
+        with profiling.phase('loader.ingest'):
+            loader.ingest(delta_path)
+if args.check_consistency:
+    differences = DataLoader().check_consistency()
+    print(f"Inconsistent values: {', '.join(differences)}" if differences else 'Aggregates are consistent with a full rebuild.')
+if args.export_columnar:
+    import columnar
+    with profiling.phase('columnar.write'):
+        issue_count = columnar.write(args.export_columnar, DataLoader())
+    print(f'Wrote {issue_count} issues as a columnar dataset to {args.export_columnar}.')
+
+# Commands managing the result cache
+if args.purge_result_cache:
+    result_cache.ResultCache().purge()
+    print('Purged the result cache.')
+elif args.result_cache_stats:
+    print(result_cache.ResultCache().get_stats())
+# Serve the analyses until interrupted
+elif args.serve:
+    from server import AnalysisServer
+    AnalysisServer(args.host, args.port, args.workers or 1).run()
+elif not args.feature:
+    if not (args.ingest or args.check_consistency or args.export_columnar):
+        print('Need to specify which feature to run with --feature flag.')
+# Run every combination of features, categories and years in batch mode
+elif args.batch:
+    from batch import run_batch
+    run_batch(args.feature, args.category, args.year, args.workers or 1,
+              args.output, formats, args.table_format or 'csv')
 # Run the feature specified in the --feature flag
-if args.feature == 1:
-    Analysis1().run()
-elif args.feature == 2:
-    Analysis2().run()
-elif args.feature == 3:
-    Analysis3().run()
-else:
+elif len(args.feature) > 1:
+    print('Use --batch to run several features.')
+elif args.feature[0] not in FEATURES:
     print('Need to specify which feature to run with --feature flag.')
+# Write the results to the output folder instead of showing them
+elif args.output:
+    from export import export
+    analysis = FEATURES[args.feature[0]]()
+    result = result_cache.compute(analysis)
+    analysis.report(result)
+    paths = export([result], args.output, formats, args.table_format or 'csv', args.workers or 1)
+    print(f"Wrote {len(paths)} files to {args.output}")
+else:
+    FEATURES[args.feature[0]]().run()
+
+if args.profile:
+    memo = timestamps.cache_info()
+    profiling.count('parsed timestamps', memo.misses)
+    profiling.count('memoized timestamps', memo.hits)
+    print(profiling.summary())
+    profiling.write_trace(args.profile)
+    print(f"Wrote profile trace to {args.profile}")
@@ -0,0 +1,224 @@
+"""
+Local HTTP server answering analysis requests from a dataset that is loaded
+once and kept in memory (run.py --serve).
+
+    GET /analysis/<feature>?category=kind[&year=2023][&repository=owner/name][&other_cutout=5]
+        [&resolution=week][&start=2022-01-01][&end=2023-12-31]
+        [&format=json|png|svg][&figure=<name>]
+    GET /status
+
+Requests are handled on an asyncio event loop. The analyses are computed
+and rendered on a pool of worker processes forked after the dataset is
+loaded, so the workers share it instead of loading it again. Responses are
+kept in memory by analysis, parameters and format, so a repeated request
+is answered without computing it again; concurrent identical requests
+share one computation.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import config
+import export
+import result_cache
+from analyses import FEATURES, Analysis2
+from data_loader import DataLoader
+from workload import RESOLUTIONS
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8611
+DEFAULT_MEMO_SIZE = 256
+CONTENT_TYPES = {'json': 'application/json', 'png': 'image/png', 'svg': 'image/svg+xml'}
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+
+    def __init__(self, status:int, message:str):
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+
+
+def make_analysis(feature:int, params:dict):
+    """
+    Creates the analysis for the request parameters. Invalid parameters
+    raise a ValueError.
+    """
+    if feature not in FEATURES:
+        raise RequestError(404, f"Unknown feature {feature}, expected one of {list(FEATURES)}")
+    if feature == 2:
+        analysis = Analysis2(params.get('category'), params.get('year'), interactive=False)
+    else:
+        analysis = FEATURES[feature](params.get('category'), interactive=False)
+    if 'repository' in params:
+        analysis.set_repository(params['repository'])
+    if 'other_cutout' in params and hasattr(analysis, 'OTHER_CUTOUT'):
+        analysis.OTHER_CUTOUT = float(params['other_cutout']) / 100
+    if feature == 3:
+        resolution = params.get('resolution', analysis.RESOLUTION)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Invalid resolution '{resolution}', expected one of {list(RESOLUTIONS)}")
+        analysis.RESOLUTION = resolution
+        analysis.START = params.get('start', analysis.START)
+        analysis.END = params.get('end', analysis.END)
+    return analysis
+
+
+def result_to_json(result:dict):
+    """
+    Returns the result with its tables converted to JSON objects.
+    """
+    converted = {key: result[key] for key in ['feature', 'repository', 'category', 'year', 'stats'] if key in result}
+    converted['tables'] = {name: json.loads(table.to_json(orient='split', date_format='iso'))
+                           for name, table in result['tables'].items()}
+    return converted
+
+
+def respond(feature:int, params:dict, response_format:str, figure:str=None):
+    """
+    Computes the analysis (or takes it from the result cache) and returns
+    the response body: the result as JSON or one of its figures.
+    Runs on the worker processes.
+    """
+    result = result_cache.compute(make_analysis(feature, params))
+    if response_format == 'json':
+        return json.dumps(result_to_json(result), default=str).encode()
+    figures = export.render_figures(result, [response_format])[response_format]
+    name = figure or next(iter(figures), None)
+    if name not in figures:
+        raise RequestError(404, f"Unknown figure '{name}', expected one of {list(figures)}")
+    return figures[name]
+
+
+def _ready():
+    return True
+
+
+class AnalysisServer:
+
+    def __init__(self, host:str=None, port:int=None, workers:int=1, memo_size:int=None):
+        self.host:str = host or DEFAULT_HOST
+        self.port:int = port or DEFAULT_PORT
+        self.workers:int = workers
+        if memo_size is None:
+            memo_size = int(config.get_parameter('ENPM611_PROJECT_SERVER_MEMO_SIZE', DEFAULT_MEMO_SIZE))
+        self.memo_size:int = memo_size
+        # Responses (or their pending computation) by request, least recently used first
+        self.memo:OrderedDict = OrderedDict()
+        self.hits:int = 0
+        self.misses:int = 0
+        self.loader = DataLoader()
+        self.pool = None
+
+    def load(self):
+        """
+        Loads everything the analyses share, before the workers are forked.
+        """
+        self.loader.preload()
+
+    def run(self):
+        self.load()
+        if 'fork' in multiprocessing.get_all_start_methods():
+            pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+        else:
+            # Without fork the workers would have to load the dataset again
+            pool = ThreadPoolExecutor(self.workers)
+        with pool:
+            # Start the workers before the event loop runs
+            for future in [pool.submit(_ready) for _ in range(self.workers)]:
+                future.result()
+            self.pool = pool
+            try:
+                asyncio.run(self.serve())
+            except KeyboardInterrupt:
+                print('Stopped the server.')
+
+    async def serve(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"Serving analyses on http://{self.host}:{self.port}/ with {self.workers} worker(s)")
+        async with server:
+            await server.serve_forever()
+
+    async def respond(self, target:str):
+        """
+        Returns the content type and body of the response to the request target.
+        """
+        url = urllib.parse.urlsplit(target)
+        params = {name: values[-1] for name, values in urllib.parse.parse_qs(url.query).items()}
+        path = url.path.strip('/').split('/')
+        if path == ['status']:
+            return CONTENT_TYPES['json'], json.dumps(self.status(), default=str).encode()
+        if len(path) != 2 or path[0] != 'analysis' or not path[1].isdigit():
+            raise RequestError(404, f"Unknown path {url.path}, expected /analysis/<feature> or /status")
+
+        feature = int(path[1])
+        response_format = params.pop('format', 'json')
+        if response_format not in CONTENT_TYPES:
+            raise ValueError(f"Invalid format '{response_format}', expected one of {list(CONTENT_TYPES)}")
+        figure = params.pop('figure', None)
+        # Validates the parameters and gives the key of the normalized parameters
+        analysis = make_analysis(feature, params)
+        key = (feature, json.dumps(analysis.params(), sort_keys=True, default=str), response_format, figure)
+
+        future = self.memo.get(key)
+        if future is not None:
+            self.hits += 1
+            self.memo.move_to_end(key)
+        else:
+            self.misses += 1
+            future = asyncio.get_running_loop().run_in_executor(self.pool, respond, feature, params, response_format, figure)
+            future.add_done_callback(lambda done: self._forget_failed(key, done))
+            self.memo[key] = future
+            while len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+        # A client disconnecting must not cancel a computation shared with others
+        return CONTENT_TYPES[response_format], await asyncio.shield(future)
+
+    def status(self):
+        return {
+            'issues': self.loader.get_issue_count(),
+            'label_categories': sorted(self.loader.get_label_categories()),
+            'year_range': self.loader.get_year_range(),
+            'migration_date': self.loader.get_migration_date(),
+            'memo': {'entries': len(self.memo), 'hits': self.hits, 'misses': self.misses},
+        }
+
+    def _forget_failed(self, key, future):
+        if (future.cancelled() or future.exception() is not None) and self.memo.get(key) is future:
+            del self.memo[key]
+
+    async def _handle(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        """
+        Answers one HTTP request and closes the connection.
+        """
+        content_type = CONTENT_TYPES['json']
+        try:
+            request_line = await reader.readline()
+            # The headers are not used
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            if method != 'GET':
+                raise RequestError(405, f"Method {method} is not supported, use GET")
+            content_type, body = await self.respond(target)
+            status = 200
+        except RequestError as e:
+            status, body = e.status, json.dumps({'error': e.message}).encode()
+        except ValueError as e:
+            status, body = 400, json.dumps({'error': str(e)}).encode()
+        except Exception as e:
+            status, body = 500, json.dumps({'error': f"{type(e).__name__}: {e}"}).encode()
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+        try:
+            writer.write(head.encode('latin-1') + body)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
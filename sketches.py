@@ -0,0 +1,112 @@
+"""
+Quantile sketch estimating the quantiles of a stream of values in bounded
+memory, used by the approximate mode of the open age and closed duration
+analysis.
+
+The sketch is a KLL sketch: a stack of compactors, where the items of
+level h each stand for 2**h values. When a level is full its items are
+sorted and every other one (starting at random at the first or second) is
+moved up a level, halving them. Lower levels are kept smaller than the
+higher ones, so the sketch holds O(k) items for any number of values and
+the rank error is about 1/k. Sketches of parts of the stream can be merged.
+"""
+
+import math
+import random
+from typing import List
+
+# Items of the top level, the rank error is roughly 1/DEFAULT_SIZE
+DEFAULT_SIZE = 200
+
+
+class QuantileSketch:
+
+    def __init__(self, size:int=DEFAULT_SIZE, seed:int=0):
+        self.size:int = size
+        # Number of values added
+        self.count:int = 0
+        # Items by level, each item of level h standing for 2**h values
+        self.compactors:List[list] = [[]]
+        # Seeded, so the same stream gives the same estimates
+        self._random = random.Random(seed)
+
+    def add(self, value):
+        self.compactors[0].append(value)
+        self.count += 1
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other:'QuantileSketch'):
+        """
+        Adds the values of another sketch, e.g. of another part of the stream.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        self._compress()
+        return self
+
+    def map(self, function):
+        """
+        Returns a copy of the sketch with the function applied to the kept
+        values. For a non-decreasing function the copy is the sketch the
+        mapped values would have given, as the items are compacted in the
+        same order.
+        """
+        mapped = QuantileSketch(self.size)
+        mapped.count = self.count
+        mapped.compactors = [[function(value) for value in items] for items in self.compactors]
+        mapped._random.setstate(self._random.getstate())
+        return mapped
+
+    def items(self):
+        """
+        Returns the kept values with their weights, sorted by value.
+        """
+        return sorted((value, 1 << level) for level, items in enumerate(self.compactors) for value in items)
+
+    def quantiles(self, fractions:List[float]):
+        """
+        Returns the estimated value at each fraction of the values (0.5 for
+        the median), None for each if the sketch is empty.
+        """
+        items = self.items()
+        if not items:
+            return [None] * len(fractions)
+        total = sum(weight for _, weight in items)
+        estimates = []
+        for fraction in fractions:
+            target = fraction * total
+            cumulative = 0
+            for value, weight in items:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            estimates.append(value)
+        return estimates
+
+    def _capacity(self, level:int):
+        depth = len(self.compactors) - level - 1
+        return max(2, math.ceil(self.size * (2 / 3) ** depth))
+
+    def _compress(self):
+        """
+        Compacts the levels until none is full.
+        """
+        full = True
+        while full:
+            full = False
+            for level in range(len(self.compactors)):
+                items = self.compactors[level]
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                items.sort()
+                # An odd item out stays on this level so the weights add up
+                kept = [items.pop()] if len(items) % 2 else []
+                self.compactors[level + 1].extend(items[self._random.random() < 0.5::2])
+                self.compactors[level] = kept
+                full = True
@@ -0,0 +1,188 @@
+"""
+Binary snapshot of the parsed issues, stored next to the data file.
+
+The snapshot file holds three pickles: a small header with the fingerprint
+of the data file it was built from, the deltas applied on top of it and
+the derived dataset values (migration date, label categories, year range),
+followed by the aggregates of the issues (see aggregates.py) and the list
+of issues. The header and the aggregates can be read on their own, without
+unpickling the issues.
+
+The small derived values are also written to a JSON metadata sidecar
+(`<data file>.meta.json`) checked against the size and modification time
+of the data file and of the snapshot only, so they can be read in
+milliseconds without hashing or unpickling anything.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from datetime import datetime
+
+# Increase when the layout of the snapshot or the model classes change
+SNAPSHOT_VERSION = 8
+SNAPSHOT_SUFFIX = '.snapshot'
+METADATA_SUFFIX = '.meta.json'
+
+
+def get_snapshot_path(data_path:str):
+    return data_path + SNAPSHOT_SUFFIX
+
+
+def get_metadata_path(data_path:str):
+    return data_path + METADATA_SUFFIX
+
+
+def hash_file(path:str):
+    """
+    Returns the sha256 hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fin:
+        for chunk in iter(lambda: fin.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(data_path:str, content_hash:str=None):
+    """
+    Returns the size, modification time and content hash of the data file.
+    """
+    stat = os.stat(data_path)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': content_hash or hash_file(data_path),
+    }
+
+
+def dataset_hash(content_hash:str, deltas:list):
+    """
+    Returns the hash identifying the data file with the deltas (content
+    hashes of the delta files, in the order applied) applied on top of it.
+    """
+    if not deltas:
+        return content_hash
+    return hashlib.sha256(' '.join([content_hash] + list(deltas)).encode()).hexdigest()
+
+
+def read_header(snapshot_path:str):
+    """
+    Returns the header of the snapshot, or None if there is no usable snapshot.
+    """
+    try:
+        with open(snapshot_path, 'rb') as fin:
+            header = pickle.load(fin)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    if not isinstance(header, dict) or header.get('version') != SNAPSHOT_VERSION:
+        return None
+    return header
+
+
+def check_header(header:dict, data_path:str):
+    """
+    Checks whether the snapshot header still matches the data file.
+    Returns 'fresh' when size and modification time match (the data file
+    is not read), 'touched' when only the modification time changed but
+    the contents hash the same, and None when the snapshot is stale.
+    """
+    if header is None:
+        return None
+    try:
+        stat = os.stat(data_path)
+    except OSError:
+        return None
+    if stat.st_size != header['size']:
+        return None
+    if stat.st_mtime_ns == header['mtime_ns']:
+        return 'fresh'
+    if hash_file(data_path) == header['sha256']:
+        return 'touched'
+    return None
+
+
+def read_issues(snapshot_path:str):
+    """
+    Returns the issues stored in the snapshot.
+    """
+    with open(snapshot_path, 'rb') as fin:
+        pickle.load(fin) # skip the header
+        pickle.load(fin) # skip the aggregates
+        return pickle.load(fin)
+
+
+def read_aggregates(snapshot_path:str):
+    """
+    Returns the aggregates stored in the snapshot.
+    """
+    with open(snapshot_path, 'rb') as fin:
+        pickle.load(fin) # skip the header
+        return pickle.load(fin)
+
+
+def write(snapshot_path:str, issues:list, aggregates, data_fingerprint:dict, **derived):
+    """
+    Writes the issues, their aggregates and the derived dataset values to
+    the snapshot.
+    The fingerprint should be taken before the data file is loaded. The
+    file is replaced atomically so a concurrent reader never sees a
+    partial snapshot.
+    """
+    header = {'version': SNAPSHOT_VERSION} | data_fingerprint | derived
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as fout:
+            pickle.dump(header, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(aggregates, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(issues, fout, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return header
+
+
+def read_metadata(metadata_path:str, data_path:str, snapshot_path:str):
+    """
+    Returns the metadata sidecar if it was written for the data file and
+    the snapshot as they are now (same sizes and modification times),
+    otherwise None. Neither file is read.
+    """
+    try:
+        with open(metadata_path, 'r') as fin:
+            metadata = json.load(fin)
+        data_stat = os.stat(data_path)
+        snapshot_stat = os.stat(snapshot_path)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(metadata, dict) or metadata.get('version') != SNAPSHOT_VERSION:
+        return None
+    if (metadata['size'], metadata['mtime_ns']) != (data_stat.st_size, data_stat.st_mtime_ns) or \
+            (metadata['snapshot_size'], metadata['snapshot_mtime_ns']) != (snapshot_stat.st_size, snapshot_stat.st_mtime_ns):
+        return None
+    if metadata['migration_date'] is not None:
+        metadata['migration_date'] = datetime.fromisoformat(metadata['migration_date'])
+    return metadata
+
+
+def write_metadata(metadata_path:str, snapshot_path:str, data_fingerprint:dict, **values):
+    """
+    Writes the fingerprint of the data file, the size and modification time
+    of the snapshot and the values to the metadata sidecar. Should be
+    written right after the snapshot.
+    """
+    stat = os.stat(snapshot_path)
+    metadata = {'version': SNAPSHOT_VERSION, 'snapshot_size': stat.st_size, 'snapshot_mtime_ns': stat.st_mtime_ns} | \
+               data_fingerprint | values
+    if isinstance(metadata.get('migration_date'), datetime):
+        metadata['migration_date'] = metadata['migration_date'].isoformat()
+    tmp_path = f"{metadata_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w') as fout:
+            json.dump(metadata, fout, indent=2)
+        os.replace(tmp_path, metadata_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,45 @@
+"""
+Fixtures shared by the tests: a small synthetic dump (see
+benchmarks/synthetic.py) and a reset of the DataLoader state around each
+test, since the loader keeps what it loaded in module globals.
+"""
+
+import copy
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import data_loader
+from benchmarks import synthetic
+
+ISSUE_COUNT = 300
+# The module globals of the loader as first imported, restored for each test
+_LOADER_STATE = {name: value for name, value in vars(data_loader).items() if name.startswith('_') and name[1:].isupper()}
+
+
+@pytest.fixture
+def dump(tmp_path):
+    """
+    Path of a synthetic dump of ISSUE_COUNT issues.
+    """
+    path = str(tmp_path / 'issues.json')
+    synthetic.write(path, ISSUE_COUNT)
+    return path
+
+
+@pytest.fixture
+def loader_env(dump, monkeypatch):
+    """
+    Points the DataLoader at the dump, without filters, with nothing loaded.
+    """
+    monkeypatch.setenv('ENPM611_PROJECT_DATA_PATH', dump)
+    for name in ['user', 'label', 'year', 'state', 'no_cache', 'rebuild_cache', 'ENPM611_PROJECT_STREAMING']:
+        monkeypatch.delenv(name, raising=False)
+    for name, value in _LOADER_STATE.items():
+        monkeypatch.setattr(data_loader, name, copy.copy(value))
+    return dump
@@ -0,0 +1,84 @@
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from aggregates import Aggregates
+from model import Issue
+
+
+@pytest.fixture
+def records(dump):
+    with open(dump, 'r') as fin:
+        return json.load(fin)
+
+
+@pytest.fixture
+def issues(records):
+    return [Issue(jobj) for jobj in records]
+
+
+def test_add_matches_full_build(issues):
+    aggregates = Aggregates.from_issues(issues[:100])
+    for issue in issues[100:]:
+        aggregates.add(issue)
+    assert aggregates.differences(Aggregates.from_issues(issues)) == []
+
+
+def test_remove_matches_full_build(issues):
+    aggregates = Aggregates.from_issues(issues)
+    for issue in issues[::3]:
+        aggregates.remove(issue)
+    kept = [issue for i, issue in enumerate(issues) if i % 3]
+    assert aggregates.differences(Aggregates.from_issues(kept)) == []
+    assert aggregates.get_migration_date() == max(issue.max_event_date for issue in kept if issue.max_event_date)
+
+
+def test_changed_issues_match_full_build(records, issues):
+    """
+    A delta replaces issues: the old versions are removed, the new ones added.
+    """
+    changed = {}
+    for jobj in records[:60]:
+        jobj = json.loads(json.dumps(jobj))
+        later = datetime.fromisoformat(jobj['updated_date'].replace('Z', '+00:00')) + timedelta(days=3)
+        later = later.strftime('%Y-%m-%dT%H:%M:%SZ')
+        if jobj['state'] == 'open':
+            jobj['events'].append({'event_type': 'closed', 'author': 'user0', 'event_date': later})
+            jobj['state'] = 'closed'
+        else:
+            jobj['events'].append({'event_type': 'reopened', 'author': 'user0', 'event_date': later})
+            jobj['state'] = 'open'
+        jobj['labels'] = jobj['labels'][1:] + ['kind/bug']
+        jobj['updated_date'] = later
+        changed[jobj['number']] = Issue(jobj)
+
+    aggregates = Aggregates.from_issues(issues)
+    for issue in issues:
+        if issue.number in changed:
+            aggregates.remove(issue)
+            aggregates.add(changed[issue.number])
+    updated = [changed.get(issue.number, issue) for issue in issues]
+    assert aggregates.differences(Aggregates.from_issues(updated)) == []
+
+
+def test_merge_matches_full_build(issues):
+    parts = [issues[:50], issues[50:120], issues[120:]]
+    merged = Aggregates()
+    for part in parts:
+        merged.merge(Aggregates.from_issues(part))
+    full = Aggregates.from_issues(issues)
+    assert merged.differences(full) == []
+    assert merged.get_label_categories() == full.get_label_categories()
+    assert merged.get_year_range() == full.get_year_range()
+
+
+def test_dates_are_bucketed_by_day(issues):
+    aggregates = Aggregates.from_issues(issues)
+    for values in [aggregates.created_dates.counts, aggregates.closed_dates.counts]:
+        assert all(type(value) is date for value in values if value is not None)
+    for counts in aggregates.open_days.values():
+        assert all(type(day) is date for _, day in counts)
+    # A day holds the counts of all the issues created that day
+    assert sum(aggregates.created_dates.counts.values()) == len(issues)
+    assert len(aggregates.created_dates.counts) == len({issue.created_date.date() for issue in issues})
@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+import pytest
+
+import batch
+import columnar
+import data_loader
+from aggregates import Aggregates
+from data_loader import DataLoader
+
+
+def _load(path:str):
+    data_loader._reset()
+    loader = DataLoader(data_path=path)
+    return {
+        'issues': loader.get_issue_frame(),
+        'labels': loader.get_label_frame(),
+        'aggregates': loader.get_aggregates(),
+        'migration_date': loader.get_migration_date(),
+        'label_categories': sorted(loader.get_label_categories()),
+        'year_range': loader.get_year_range(),
+    }
+
+
+@pytest.fixture
+def folder(loader_env, tmp_path):
+    """
+    The synthetic dump exported as a columnar dataset.
+    """
+    path = str(tmp_path / 'columnar')
+    columnar.write(path, DataLoader())
+    data_loader._reset()
+    return path
+
+
+def _assert_same(expected:dict, actual:dict):
+    # Copied, the columns of a columnar dataset are memory-mapped arrays
+    pd.testing.assert_frame_equal(actual['issues'].copy(), expected['issues'])
+    pd.testing.assert_frame_equal(actual['labels'].copy(), expected['labels'])
+    assert actual['aggregates'].differences(expected['aggregates']) == []
+    for name in ['migration_date', 'label_categories', 'year_range']:
+        assert actual[name] == expected[name], name
+
+
+def test_columnar_matches_json(loader_env, folder):
+    _assert_same(_load(loader_env), _load(folder))
+
+
+@pytest.mark.parametrize('name,value', [
+    ('label', 'kind'),
+    ('label', 'kind/bug'),
+    ('year', '2020'),
+    ('state', 'open'),
+    ('state', 'closed'),
+])
+def test_select_matches_filtered_json(loader_env, folder, monkeypatch, name, value):
+    full = _load(folder)
+    monkeypatch.setenv(name, value)
+    expected = _load(loader_env)
+    actual = _load(folder)
+    _assert_same(expected, actual)
+    assert 0 < len(actual['issues']) < len(full['issues'])
+    # The migration date stays the one of the whole dataset
+    assert actual['migration_date'] == full['migration_date']
+
+
+def test_build_aggregates_matches_issues(loader_env, folder):
+    issues = DataLoader().get_issues()
+    expected = Aggregates.from_issues(issues)
+    actual = columnar.build_aggregates(columnar.ColumnarDataset(folder))
+    assert actual.differences(expected) == []
+    assert list(actual.categories) == list(expected.categories)
+    assert all(list(actual.sublabels[category]) == list(expected.sublabels[category]) for category in expected.sublabels)
+
+
+def _run_batch(output:str):
+    data_loader._reset()
+    batch.run_batch([1, 2, 3], 'kind,area', '2020,all', output=output, formats=['svg'])
+    # The tables and statistics, not the figures
+    return {os.path.relpath(os.path.join(folder, name), output): open(os.path.join(folder, name)).read()
+            for folder, _, names in os.walk(output) for name in names if not name.endswith('.svg')}
+
+
+def test_batch_on_columnar_matches_json(loader_env, folder, monkeypatch, tmp_path):
+    monkeypatch.setenv('no_result_cache', 'true')
+    expected = _run_batch(str(tmp_path / 'json_output'))
+    monkeypatch.setenv('ENPM611_PROJECT_DATA_PATH', folder)
+    actual = _run_batch(str(tmp_path / 'columnar_output'))
+    assert actual and actual == expected
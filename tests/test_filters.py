@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+import timestamps
+from data_loader import DataLoader
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_rejected_records_are_not_parsed(loader_env, monkeypatch, streaming):
+    """
+    Without a snapshot, the migration date still covers the rejected records,
+    but only the latest of their event dates is parsed.
+    """
+    with open(loader_env, 'r') as fin:
+        records = json.load(fin)
+    monkeypatch.setenv('state', 'open')
+    monkeypatch.setenv('no_cache', 'true')
+    timestamps.clear_cache()
+    loader = DataLoader(streaming=streaming)
+    kept = list(loader.iter_issues()) if streaming else loader.get_issues()
+    assert 0 < len(kept) < len(records)
+
+    dates = [jevent['event_date'] for jobj in records for jevent in jobj.get('events', [])]
+    assert loader.get_migration_date() == timestamps.parse_timestamp(max(dates))
+    kept_strings = {value for jobj in records if jobj['state'] == 'open' for value in json.dumps(jobj).split('"')}
+    rejected = {jevent['event_date'] for jobj in records if jobj['state'] != 'open'
+                for jevent in jobj.get('events', [])} - kept_strings - {max(dates)}
+    assert rejected
+    for value in rejected:
+        hits = timestamps.cache_info().hits
+        timestamps.parse_timestamp(value)
+        assert timestamps.cache_info().hits == hits, value
@@ -0,0 +1,47 @@
+import json
+import random
+from datetime import timedelta
+
+import pytest
+
+from aggregates import Aggregates
+from indexes import IntervalIndex
+from model import Issue
+
+
+@pytest.fixture
+def issues(dump):
+    with open(dump, 'r') as fin:
+        return [Issue(jobj) for jobj in json.load(fin)]
+
+
+def _open_at(issues, category, label, time):
+    """
+    Counts the label rows of the issues open at the time, one issue at a time.
+    """
+    return sum(1 for issue in issues for each in issue.labels if each.category == category and each.sublabel == label
+               for opened, closed in issue.get_open_intervals() if opened <= time and (closed is None or closed >= time))
+
+
+def test_interval_index_matches_open_periods(issues):
+    """
+    The index counts the issues open at the start (00:00 UTC) of each day.
+    """
+    index = IntervalIndex(Aggregates.from_issues(issues).open_days['kind'])
+    first = min(issue.created_date for issue in issues).replace(hour=0, minute=0, second=0, microsecond=0)
+    last = max(issue.updated_date for issue in issues)
+    rnd = random.Random(611)
+    days = [first + timedelta(days=rnd.randrange((last - first).days + 2)) for _ in range(30)]
+    # The days around the ends of the periods themselves
+    for opened, closed in issues[0].get_open_intervals():
+        for time in [opened, closed]:
+            if time is not None:
+                day = time.replace(hour=0, minute=0, second=0, microsecond=0)
+                days += [day, day + timedelta(days=1)]
+    days += [first, first + timedelta(days=1)]
+    for day in days:
+        for label in index.labels:
+            expected = _open_at(issues, 'kind', label, day)
+            assert index.open_at(label, day) == expected
+            # Any time of the day counts at its start
+            assert index.open_at(label, day + timedelta(hours=rnd.randrange(24))) == expected
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from analyses import Analysis1
+
+
+@pytest.fixture
+def shards(loader_env, tmp_path, monkeypatch):
+    """
+    The dump split into three data files, as a glob pattern. Some issues
+    get several rare labels of a category, grouped as 'other' by Analysis1.
+    """
+    with open(loader_env, 'r') as fin:
+        issues = json.load(fin)
+    for jobj in issues[::7]:
+        jobj['labels'] += ['kind/rare-a', 'kind/rare-b', 'area/rare-a', 'area/rare-b']
+    with open(loader_env, 'w') as fout:
+        json.dump(issues, fout)
+    folder = tmp_path / 'shards'
+    folder.mkdir()
+    for part in range(3):
+        with open(folder / f"issues_{part}.json", 'w') as fout:
+            json.dump(issues[part::3], fout)
+    monkeypatch.setenv('no_result_cache', 'true')
+    monkeypatch.setenv('ENPM611_PROJECT_SHARD_WORKERS', '1')
+    return str(folder / '*.json')
+
+
+def _stats(result):
+    stats = result['stats']
+    for state in ['open', 'closed']:
+        stats[state]['labels'] = sorted(stats[state]['labels'], key=lambda each: each['label'])
+    return stats
+
+
+@pytest.mark.parametrize('category', ['kind', 'area'])
+def test_sharded_analysis1_matches_single_file(shards, monkeypatch, category):
+    expected = _stats(Analysis1(category, interactive=False).compute())
+    monkeypatch.setenv('ENPM611_PROJECT_DATA_PATH', shards)
+    analysis = Analysis1(category, interactive=False)
+    assert analysis.loader.sharded
+    assert _stats(analysis.compute()) == expected
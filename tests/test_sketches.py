@@ -0,0 +1,96 @@
+import bisect
+import random
+
+import pytest
+
+import data_loader
+from analyses import Analysis1
+from data_loader import _iter_json_array
+from sketches import QuantileSketch
+
+FRACTIONS = [0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+
+def _rank_errors(values, estimates):
+    """
+    Returns how far the rank of each estimate is from its fraction, as a
+    fraction of the values. Any rank of a repeated value counts.
+    """
+    ordered = sorted(values)
+    errors = []
+    for fraction, estimate in zip(FRACTIONS, estimates):
+        low, high = bisect.bisect_left(ordered, estimate) / len(ordered), bisect.bisect_right(ordered, estimate) / len(ordered)
+        errors.append(0.0 if low <= fraction <= high else min(abs(fraction - low), abs(fraction - high)))
+    return errors
+
+
+def _stream(count, seed=611):
+    rnd = random.Random(seed)
+    # Skewed and repeated, like durations in days
+    return [int(rnd.expovariate(1 / 200)) for _ in range(count)]
+
+
+def test_small_stream_is_exact():
+    values = _stream(100)
+    sketch = QuantileSketch(200)
+    for value in values:
+        sketch.add(value)
+    assert max(_rank_errors(values, sketch.quantiles(FRACTIONS))) <= 1 / len(values)
+
+
+@pytest.mark.parametrize('size', [50, 200])
+def test_quantiles_within_error_bound(size):
+    values = _stream(50000)
+    sketch = QuantileSketch(size)
+    for value in values:
+        sketch.add(value)
+    assert sketch.count == len(values)
+    assert sum(weight for _, weight in sketch.items()) == len(values)
+    # The rank error is about 1/size
+    assert max(_rank_errors(values, sketch.quantiles(FRACTIONS))) <= 3 / size
+
+
+def test_merged_sketches_within_error_bound():
+    values = _stream(30000)
+    merged = QuantileSketch(200)
+    for start in range(0, len(values), 7000):
+        part = QuantileSketch(200)
+        for value in values[start:start + 7000]:
+            part.add(value)
+        merged.merge(part)
+    assert merged.count == len(values)
+    assert max(_rank_errors(values, merged.quantiles(FRACTIONS))) <= 3 / 200
+
+
+def test_empty_and_deterministic():
+    assert QuantileSketch().quantiles([0.5]) == [None]
+    first, second = QuantileSketch(50), QuantileSketch(50)
+    for value in _stream(10000):
+        first.add(value)
+        second.add(value)
+    assert first.quantiles(FRACTIONS) == second.quantiles(FRACTIONS)
+
+
+def test_approximate_analysis1_streams_once(loader_env, monkeypatch):
+    """
+    The open ages are counted after the pass that finds the migration date,
+    with the exact means and counts of the full analysis.
+    """
+    monkeypatch.setenv('no_result_cache', 'true')
+    # Without a snapshot holding the migration date
+    monkeypatch.setenv('no_cache', 'true')
+    expected = Analysis1('kind', interactive=False).compute()['stats']
+    data_loader._reset()
+    monkeypatch.setenv('approximate', 'true')
+    analysis = Analysis1('kind', interactive=False)
+    # The label categories are known, the migration date isn't
+    monkeypatch.setattr(data_loader, '_MIGRATION_DATE', None)
+    passes = []
+    monkeypatch.setattr(data_loader, '_iter_json_array', lambda *args: passes.append(args) or _iter_json_array(*args))
+    actual = analysis.compute()['stats']
+    assert len(passes) == 1
+    for state in ['open', 'closed']:
+        assert actual[state]['count'] == expected[state]['count']
+        assert actual[state]['mean'] == pytest.approx(expected[state]['mean'])
+        assert ({label['label']: (label['count'], pytest.approx(label['mean'])) for label in actual[state]['labels']} ==
+                {label['label']: (label['count'], label['mean']) for label in expected[state]['labels']})
@@ -0,0 +1,66 @@
+import io
+import json
+
+import pytest
+
+import data_loader
+from data_loader import DataLoader, _iter_json_array
+
+# Strings with brackets, commas, quotes and escapes that must not end an element
+TRICKY = [
+    {'title': 'a ] b, c [ d', 'text': 'quote \" and backslash \\\\ and \\u00e9', 'labels': []},
+    [],
+    {},
+    [1, [2, [3, {'x': ']'}]], 'y'],
+    'plain string',
+    -1.5e3,
+    None,
+    True,
+    {'nested': {'deep': [{'a': 'b'}] * 3}, 'emoji': '\U0001F41B'},
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 64, data_loader.STREAM_CHUNK_SIZE])
+@pytest.mark.parametrize('text', [
+    json.dumps(TRICKY),
+    json.dumps(TRICKY, indent=4),
+    '[]',
+    '  [ \n ]  ',
+    ' [1 ,2,\n\t3 ] ',
+])
+def test_iter_json_array_matches_json_load(text, chunk_size):
+    assert list(_iter_json_array(io.StringIO(text), chunk_size)) == json.loads(text)
+
+
+def test_iter_json_array_on_dump(dump):
+    with open(dump, 'r') as fin:
+        expected = json.load(fin)
+    with open(dump, 'r') as fin:
+        assert list(_iter_json_array(fin, 100)) == expected
+
+
+def _summary(issue):
+    return (issue.number, issue.state, issue.created_date, issue.closed_date, [label.full_label() for label in issue.labels])
+
+
+def _values(loader):
+    return loader.get_migration_date(), sorted(loader.get_label_categories()), loader.get_year_range()
+
+
+def test_streaming_loader_matches_full_load(loader_env, monkeypatch):
+    streaming = DataLoader(streaming=True)
+    streamed = [_summary(issue) for issue in streaming.iter_issues()]
+    streamed_values = _values(streaming)
+    for name in ['_MIGRATION_DATE', '_LABEL_CATEGORY_LIST', '_YEAR_RANGE']:
+        monkeypatch.setattr(data_loader, name, None)
+    loader = DataLoader(streaming=False)
+    assert streamed == [_summary(issue) for issue in loader.get_issues()]
+    assert streamed_values == _values(loader)
+
+
+def test_migration_date_without_issue_table(loader_env, monkeypatch):
+    monkeypatch.setenv('no_cache', 'true')
+    loader = DataLoader(streaming=False)
+    migration_date = loader.get_migration_date()
+    assert 'issues' not in data_loader._FRAMES
+    assert migration_date == loader.get_issue_frame()['max_event_date'].max().to_pydatetime()
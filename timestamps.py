@@ -0,0 +1,75 @@
+"""
+Timestamp parsing for the dates contained in the issues JSON.
+
+GitHub exports its dates as ISO-8601 strings, so those are parsed with
+datetime.fromisoformat, which is much faster than dateutil. Anything the
+fast path can't handle falls back to dateutil. Parsed strings are memoized
+because the same timestamp shows up many times (e.g. an issue and the
+events created with it).
+"""
+
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+CACHE_SIZE = 1 << 16
+
+# Dates can be exchanged as int64 microseconds since the epoch, with
+# MISSING standing for None
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MISSING = -(1 << 63)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(value:str):
+    try:
+        if value.endswith(('Z', 'z')):
+            # fromisoformat only accepts the Z suffix from Python 3.11
+            return datetime.fromisoformat(value[:-1] + '+00:00')
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    # Imported here since it is rarely needed and slow to import
+    from dateutil import parser
+    try:
+        return parser.parse(value)
+    except (ValueError, OverflowError):
+        return None
+
+
+def parse_timestamp(value:str):
+    """
+    Parses a timestamp string from the issues JSON into a datetime.
+    Returns None if the value is missing or can't be parsed.
+    """
+    if not isinstance(value, str):
+        return None
+    return _parse(value)
+
+
+def to_epoch_us(value:datetime):
+    """
+    Converts an aware datetime to microseconds since the epoch (MISSING for None).
+    """
+    if value is None:
+        return MISSING
+    return (value - EPOCH) // _MICROSECOND
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def from_epoch_us(value:int):
+    """
+    Converts microseconds since the epoch back to a UTC datetime (None for MISSING).
+    """
+    if value == MISSING:
+        return None
+    return EPOCH + timedelta(microseconds=value)
+
+
+def cache_info():
+    return _parse.cache_info()
+
+
+def clear_cache():
+    _parse.cache_clear()
+    from_epoch_us.cache_clear()
@@ -0,0 +1,41 @@
+"""
+Dates at which the historical open issue counts are sampled. The counts
+themselves are answered by the interval index (see indexes.py) at each
+sampled date, so a window or a coarser resolution only queries fewer dates
+instead of computing every day first.
+"""
+
+import pandas as pd
+
+# Point-in-time resolutions the open counts can be sampled at
+RESOLUTIONS = {
+    'day': None,
+    'week': 'W-MON',
+    'month': 'MS',
+}
+
+
+def sample_dates(first, last, start=None, end=None, resolution:str='day'):
+    """
+    Returns the dates from first to last, restricted to the dates between
+    start and end (inclusive): every day from the first date, or the start
+    of every week or month.
+    """
+    dates = pd.date_range(first, last, freq='D')
+    if start is not None:
+        dates = dates[dates >= to_timestamp(start, dates.tz)]
+    if end is not None:
+        dates = dates[dates <= to_timestamp(end, dates.tz)]
+    freq = RESOLUTIONS[resolution]
+    if freq is not None and len(dates):
+        dates = pd.date_range(dates[0].normalize(), dates[-1], freq=freq)
+    return dates
+
+
+def to_timestamp(value, tz='UTC'):
+    """
+    Converts a date (string or datetime) to a Timestamp, assuming `tz` if it
+    has no timezone.
+    """
+    value = pd.Timestamp(value)
+    return value.tz_localize(tz) if value.tzinfo is None else value